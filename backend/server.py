@@ -1,31 +1,282 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, UpdateOne, monitoring
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError, WaitQueueTimeoutError
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter
 from typing import List, Optional, Dict
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import hashlib
+import gzip
+import base64
+import json
+import orjson
+import csv
+import io
 import jwt
 from passlib.context import CryptContext
 import asyncio
+import bisect
+import math
 import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # optional: brotli variants are simply not offered without it
+    brotli = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional: only needed when SHARED_STATE_URL points at a Redis-compatible server
+    aioredis = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Instrumentation, exported in Prometheus text format at /metrics (set METRICS_TOKEN to require a bearer token)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+# Clients can send any method token; anything else shares one label so the series count stays bounded
+METRIC_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+class Histogram:
+    """Prometheus histogram for one label set; the labels are rendered once, when it is created"""
+    
+    __slots__ = ("buckets", "counts", "sum", "labels")
+    
+    def __init__(self, buckets: tuple, labels: str = ""):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.labels = labels
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+    
+    def render(self, name: str) -> List[str]:
+        prefix = f"{self.labels}," if self.labels else ""
+        series = f"{{{self.labels}}}" if self.labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{series} {self.sum}")
+        lines.append(f"{name}_count{series} {cumulative}")
+        return lines
+
+class CommandMetrics(monitoring.CommandListener):
+    """Duration of every MongoDB command per (collection, command), from the driver's command events"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = {}
+        self.durations = {}
+        self.failures = {}
+    
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            # getMore names the collection separately; database-level commands have none
+            target = event.command.get("collection", "-")
+        self._started[(event.connection_id, event.request_id)] = (target, event.command_name)
+    
+    def succeeded(self, event):
+        self._observe(event, failed=False)
+    
+    def failed(self, event):
+        self._observe(event, failed=True)
+    
+    def _observe(self, event, failed: bool):
+        key = self._started.pop((event.connection_id, event.request_id), None)
+        if key is None:
+            return
+        with self._lock:
+            histogram = self.durations.get(key)
+            if histogram is None:
+                histogram = self.durations[key] = Histogram(LATENCY_BUCKETS, f'collection="{key[0]}",command="{key[1]}"')
+            histogram.observe(event.duration_micros / 1e6)
+            if failed:
+                self.failures[key] = self.failures.get(key, 0) + 1
+
+command_metrics = CommandMetrics()
+
+# MongoDB connection pool (sized per worker: total connections = workers x MONGO_MAX_POOL_SIZE)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client.get_database("bitsecure")
+DB_NAME = os.environ.get('DB_NAME', 'bitsecure')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+# Connections kept open while idle, so the first requests after a deploy do not all open sockets at once
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+# Connections allowed to be established concurrently per pool
+MONGO_MAX_CONNECTING = int(os.environ.get('MONGO_MAX_CONNECTING', 2))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 0)) or None
+# How long a request may wait for a free connection before failing with 503 instead of stalling
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 10000))
+# Wire compression, e.g. "zstd,snappy,zlib" (zstd needs zstandard, snappy needs python-snappy; unavailable ones are skipped)
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')
+MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE', 'primary')
+# Admin listings and exports tolerate slightly stale data and can be served by secondaries
+MONGO_REPORTING_READ_PREFERENCE = os.environ.get('MONGO_REPORTING_READ_PREFERENCE', 'secondaryPreferred')
+MONGO_REPORTING_MAX_STALENESS_SECONDS = int(os.environ.get('MONGO_REPORTING_MAX_STALENESS_SECONDS', -1))
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool counters fed by the driver's CMAP events.
+    
+    Events fire on Motor's executor threads; a checkout's start and end fire on the
+    same thread, which is how the wait time is measured.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {
+            "pools": 0,
+            "open": 0,
+            "checked_out": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checkout_timeouts": 0,
+            "cleared": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0
+        }
+    
+    def _add(self, counter: str, delta=1):
+        with self._lock:
+            self.counters[counter] += delta
+    
+    def pool_created(self, event):
+        self._add("pools")
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        self._add("cleared")
+    
+    def pool_closed(self, event):
+        self._add("pools", -1)
+    
+    def connection_created(self, event):
+        self._add("open")
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        self._add("open", -1)
+    
+    def connection_check_out_started(self, event):
+        self._local.started_at = time.perf_counter()
+    
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.counters["checkout_failures"] += 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self.counters["checkout_timeouts"] += 1
+    
+    def connection_checked_out(self, event):
+        waited = time.perf_counter() - getattr(self._local, "started_at", time.perf_counter())
+        with self._lock:
+            self.counters["checked_out"] += 1
+            self.counters["checkouts"] += 1
+            self.counters["wait_seconds_total"] += waited
+            self.counters["wait_seconds_max"] = max(self.counters["wait_seconds_max"], waited)
+    
+    def connection_checked_in(self, event):
+        self._add("checked_out", -1)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "wait_seconds_avg": counters["wait_seconds_total"] / counters["checkouts"] if counters["checkouts"] else 0.0
+        }
+
+def read_preference(name: str, max_staleness_seconds: int = -1):
+    return make_read_preference(read_pref_mode_from_name(name), None, max_staleness_seconds)
+
+pool_metrics = PoolMetrics()
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxConnecting=MONGO_MAX_CONNECTING,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    event_listeners=[pool_metrics, command_metrics],
+    **({"compressors": MONGO_COMPRESSORS} if MONGO_COMPRESSORS else {})
+)
+db = client.get_database(DB_NAME, read_preference=read_preference(MONGO_READ_PREFERENCE))
+reporting_db = client.get_database(
+    DB_NAME,
+    read_preference=read_preference(MONGO_REPORTING_READ_PREFERENCE, MONGO_REPORTING_MAX_STALENESS_SECONDS)
+)
+
+# Multi-document transactions need a replica set; without them each write is still individually atomic
+MONGO_USE_TRANSACTIONS = os.environ.get('MONGO_USE_TRANSACTIONS', 'false').lower() == 'true'
+# Attempts for a transaction that keeps hitting write conflicts, and for a commit with an unknown outcome
+MONGO_TRANSACTION_ATTEMPTS = int(os.environ.get('MONGO_TRANSACTION_ATTEMPTS', 5))
+
+# One-off backfill of the admin search fields, run in the background by a single worker
+USER_BACKFILL_MIGRATION_ID = "user_search_fields"
+USER_BACKFILL_BATCH_SIZE = int(os.environ.get('USER_BACKFILL_BATCH_SIZE', 1000))
+USER_BACKFILL_LEADER_TTL_SECONDS = float(os.environ.get('USER_BACKFILL_LEADER_TTL_SECONDS', 60))
+
+# Indexes required by the queries below: (collection, keys, options)
+REQUIRE_INDEXES = os.environ.get('REQUIRE_INDEXES', 'false').lower() == 'true'
+INDEX_PROGRESS_INTERVAL_SECONDS = float(os.environ.get('INDEX_PROGRESS_INTERVAL_SECONDS', 5))
+REQUIRED_INDEXES = [
+    ("users", [("id", ASCENDING)], {"name": "users_id", "unique": True}),
+    ("users", [("email", ASCENDING)], {"name": "users_email", "unique": True}),
+    ("users", [("created_at", DESCENDING), ("id", DESCENDING)], {"name": "users_created_at_id"}),
+    ("users", [("email_lower", ASCENDING), ("id", ASCENDING)], {"name": "users_email_lower_id"}),
+    ("users", [("name_lower", ASCENDING), ("id", ASCENDING)], {"name": "users_name_lower_id"}),
+    ("users", [("balance", ASCENDING), ("id", ASCENDING)], {"name": "users_balance_id"}),
+    ("users", [("is_admin", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {"name": "users_is_admin_created_at_id"}),
+    ("transactions", [("id", ASCENDING)], {"name": "transactions_id", "unique": True}),
+    ("transactions", [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {"name": "transactions_user_created_at_id"}),
+    ("transactions", [("created_at", DESCENDING), ("id", DESCENDING)], {"name": "transactions_created_at_id"}),
+    ("messages", [("id", ASCENDING)], {"name": "messages_id", "unique": True}),
+    ("messages", [("to_user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {"name": "messages_to_user_created_at_id"}),
+    ("messages", [("created_at", DESCENDING), ("id", DESCENDING)], {"name": "messages_created_at_id"}),
+    ("support_tickets", [("id", ASCENDING)], {"name": "support_tickets_id", "unique": True}),
+    ("support_tickets", [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {"name": "support_tickets_user_created_at_id"}),
+    ("support_tickets", [("created_at", DESCENDING), ("id", DESCENDING)], {"name": "support_tickets_created_at_id"}),
+    ("notifications", [("id", ASCENDING)], {"name": "notifications_id", "unique": True}),
+    ("revoked_tokens", [("jti", ASCENDING)], {"name": "revoked_tokens_jti", "unique": True}),
+    ("revoked_tokens", [("revoked_at", ASCENDING)], {"name": "revoked_tokens_revoked_at"}),
+    ("revoked_tokens", [("expires_at", ASCENDING)], {"name": "revoked_tokens_expires_at", "expireAfterSeconds": 0}),
+    ("notifications", [("created_at", DESCENDING), ("id", DESCENDING)], {"name": "notifications_created_at_id"}),
+    ("notifications", [("read", ASCENDING)], {"name": "notifications_unread", "partialFilterExpression": {"read": False}}),
+]
 
 # Create the main app
-app = FastAPI(title="BitSecure Trading Platform")
+app = FastAPI(title="BitSecure Trading Platform", default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -34,6 +285,37 @@ api_router = APIRouter(prefix="/api")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-here')
+ACCESS_TOKEN_MINUTES = int(os.environ.get('ACCESS_TOKEN_MINUTES', 15))
+REFRESH_TOKEN_DAYS = int(os.environ.get('REFRESH_TOKEN_DAYS', 7))
+# Single-use tickets for push channels, which browsers can only authenticate through the URL
+STREAM_TICKET_SECONDS = int(os.environ.get('STREAM_TICKET_SECONDS', 30))
+REVOCATION_SYNC_SECONDS = float(os.environ.get('REVOCATION_SYNC_SECONDS', 10))
+
+# Password hashing pool (bcrypt must never run on the event loop)
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password")
+password_pool_stats = {
+    "in_flight": 0,
+    "completed": 0,
+    "rejected": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+    "compute_seconds_total": 0.0,
+    "compute_seconds_max": 0.0
+}
+password_histograms = {
+    "wait": Histogram(LATENCY_BUCKETS, 'stage="wait"'),
+    "compute": Histogram(LATENCY_BUCKETS, 'stage="compute"')
+}
+
+# Authenticated user cache
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 30))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+
+# Verified-token cache: skips HS256 verification for tokens seen recently (still bounded by their exp)
+TOKEN_CACHE_TTL_SECONDS = float(os.environ.get('TOKEN_CACHE_TTL_SECONDS', 300))
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', 50000))
 
 # Wallet addresses (user's actual wallets)
 WALLET_ADDRESSES = {
@@ -44,7 +326,134 @@ WALLET_ADDRESSES = {
     "ADA": "addr1qy5mhyrah3qe0swefywe0xdkzqte67ydzqjrd6krzjtuweffhwg8m0zpjlqajjgaj7vmvyqhn4ug6ypyxm4vx9yhcajsgwh3xp"
 }
 
-# Trading data simulation
+# Pagination
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 500))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Bulk approve/reject of pending transactions
+BULK_MAX_TRANSACTIONS = int(os.environ.get('BULK_MAX_TRANSACTIONS', 1000))
+
+# Push channels (WebSocket / Server-Sent Events)
+PUSH_QUEUE_SIZE = int(os.environ.get('PUSH_QUEUE_SIZE', 8))
+SSE_KEEPALIVE_SECONDS = float(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+
+# Notification outbox: inserts are batched by a background writer instead of awaited inline
+NOTIFICATION_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_QUEUE_SIZE', 10000))
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 200))
+NOTIFICATION_FLUSH_SECONDS = float(os.environ.get('NOTIFICATION_FLUSH_SECONDS', 0.5))
+notification_queue = asyncio.Queue(maxsize=NOTIFICATION_QUEUE_SIZE)
+outbox_stats = {
+    "enqueued": 0,
+    "flushed": 0,
+    "failed": 0,
+    "inline_writes": 0,
+    "flushes": 0,
+    "flush_seconds_total": 0.0,
+    "flush_seconds_max": 0.0
+}
+
+# Shared state across workers: empty keeps it in-process (single worker), redis://host:port/db shares it
+SHARED_STATE_URL = os.environ.get('SHARED_STATE_URL', '')
+SHARED_STATE_PREFIX = os.environ.get('SHARED_STATE_PREFIX', 'bitsecure:')
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# Rate limits: token buckets given as "requests/seconds" (burst of `requests`, refilled evenly over `seconds`)
+def parse_rate(value: str) -> tuple:
+    requests, seconds = value.split("/")
+    return float(requests), float(requests) / float(seconds)
+
+# Off until deployed with the proxy setting below: behind a proxy every client shares its address
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'false').lower() == 'true'
+RATE_LIMITS = {
+    "ip": parse_rate(os.environ.get('RATE_LIMIT_IP', '600/60')),  # every request from one address
+    "auth": parse_rate(os.environ.get('RATE_LIMIT_AUTH', '10/60')),  # login, register, refresh; per address
+    "write": parse_rate(os.environ.get('RATE_LIMIT_WRITE', '30/60')),  # deposits, withdrawals, tickets; per user
+    "read": parse_rate(os.environ.get('RATE_LIMIT_READ', '300/60'))  # everything else; per user
+}
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+# Behind a reverse proxy the client address is the last X-Forwarded-For entry, appended by that proxy
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.environ.get('RATE_LIMIT_TRUST_FORWARDED_FOR', 'false').lower() == 'true'
+RATE_LIMIT_ROUTES = {
+    ("POST", "/api/auth/login"): "auth",
+    ("POST", "/api/auth/register"): "auth",
+    ("POST", "/api/auth/refresh"): "auth",
+    ("POST", "/api/withdrawals"): "write",
+    ("POST", "/api/support/tickets"): "write"
+}
+RATE_LIMIT_PREFIXES = [("POST", "/api/deposits/", "write")]
+
+# Admin exports
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+# Simulated crypto prices - in real app you'd fetch from CoinGecko or similar
+CRYPTO_PRICES = {
+    "BTC": {
+        "price": 43250.67,
+        "change_24h": 2.34,
+        "symbol": "₿"
+    },
+    "ETH": {
+        "price": 2658.91,
+        "change_24h": -1.23,
+        "symbol": "Ξ"
+    },
+    "USDT": {
+        "price": 1.00,
+        "change_24h": 0.01,
+        "symbol": "₮"
+    },
+    "BNB": {
+        "price": 312.45,
+        "change_24h": 4.56,
+        "symbol": "BNB"
+    },
+    "ADA": {
+        "price": 0.48,
+        "change_24h": -2.1,
+        "symbol": "₳"
+    }
+}
+
+# Simulated news - in real app you'd fetch from news API
+CRYPTO_NEWS = [
+    {
+        "id": "1",
+        "title": "Bitcoin alcanza nuevo máximo mensual",
+        "summary": "El precio del Bitcoin supera los $43,000 impulsado por mayor adopción institucional",
+        "date": "2024-01-15T10:30:00Z",
+        "source": "CryptoNews"
+    },
+    {
+        "id": "2", 
+        "title": "Ethereum prepara nueva actualización",
+        "summary": "La red Ethereum planea implementar mejoras de escalabilidad para reducir fees",
+        "date": "2024-01-14T15:45:00Z",
+        "source": "ETH Today"
+    },
+    {
+        "id": "3",
+        "title": "Regulaciones crypto en Europa",
+        "summary": "La UE finaliza el marco regulatorio MiCA para criptomonedas",
+        "date": "2024-01-13T09:15:00Z",
+        "source": "Regulatory Watch"
+    }
+]
+
+# Static responses are encoded once; STATIC_CACHE_SECONDS bounds how long clients may reuse them
+STATIC_CACHE_SECONDS = int(os.environ.get('STATIC_CACHE_SECONDS', 60))
+STATIC_CACHE_CONTROL = f"public, max-age={STATIC_CACHE_SECONDS}"
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 9))
+
+# Platform aggregates kept in one document and adjusted with $inc as balances change
+SUPPORTED_CRYPTOS = ["BTC", "ETH", "USDT", "BNB", "ADA"]
+PLATFORM_STATS_ID = "global"
+STATS_RECONCILE_SECONDS = float(os.environ.get('STATS_RECONCILE_SECONDS', 3600))
+# Upper bound on one reconciliation; the "stats" lease is released earlier when the run ends
+STATS_RECONCILE_LEASE_SECONDS = float(os.environ.get('STATS_RECONCILE_LEASE_SECONDS', 600))
+
+# Trading data simulation (seed values; the ticker never mutates them)
+TRADING_TICK_SECONDS = float(os.environ.get('TRADING_TICK_SECONDS', 4))
+MARKET_LEADER_TTL_SECONDS = float(os.environ.get('MARKET_LEADER_TTL_SECONDS', TRADING_TICK_SECONDS * 3))
 trading_pairs = [
     {"pair": "BTC/USDT", "change": 2.61, "direction": "LONG", "leverage": "20x", "value": 25766.2},
     {"pair": "ETH/USDT", "change": -1.51, "direction": "SHORT", "leverage": "10x", "value": 32751.53},
@@ -68,6 +477,13 @@ class User(BaseModel):
     })  # New crypto-specific balances
     is_admin: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Lowercased copies so the admin search can prefix-match on an index
+    email_lower: str = ""
+    name_lower: str = ""
+    
+    def model_post_init(self, __context):
+        self.email_lower = self.email.lower()
+        self.name_lower = self.name.lower()
 
 class UserCreate(BaseModel):
     name: str
@@ -154,6 +570,15 @@ class SupportTicketRequest(BaseModel):
     read: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+class BulkTransactionRequest(BaseModel):
+    transaction_ids: List[str] = Field(min_length=1, max_length=BULK_MAX_TRANSACTIONS)
+
 class MessageCreate(BaseModel):
     to_user_id: str
     subject: str
@@ -163,35 +588,780 @@ class TradingData(BaseModel):
     pairs: List[dict]
     last_updated: datetime
 
+# Caches
+class TTLCache:
+    """LRU cache whose entries also expire after a fixed time-to-live"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, key):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+    
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+
+user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+token_cache = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+
+class RevocationSet:
+    """Revoked token ids with their expiry; entries disappear once the token could no longer be used anyway"""
+    
+    def __init__(self):
+        self._expires_at = {}
+        self.last_synced_at = None
+    
+    def add(self, jti: str, expires_at: float):
+        self._expires_at[jti] = expires_at
+    
+    def __contains__(self, jti) -> bool:
+        return jti in self._expires_at
+    
+    def __len__(self) -> int:
+        return len(self._expires_at)
+    
+    def purge(self):
+        now = time.time()
+        for jti in [jti for jti, expires_at in self._expires_at.items() if expires_at <= now]:
+            del self._expires_at[jti]
+
+revoked_tokens = RevocationSet()
+
+class CachedPayload:
+    """JSON response body encoded once and served as-is to every client.
+    
+    With compress=True gzip (and brotli, when installed) variants are built up
+    front as well; each representation carries its own strong ETag.
+    """
+    
+    def __init__(self, content, compress: bool = False):
+        self.body = orjson.dumps(content)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.variants = {}
+        if compress:
+            if brotli is not None:
+                self.variants["br"] = (brotli.compress(self.body), f'"{digest}-br"')
+            self.variants["gzip"] = (gzip.compress(self.body, GZIP_LEVEL), f'"{digest}-gzip"')
+        self.etags = {self.etag} | {etag for _, etag in self.variants.values()}
+
+class BroadcastHub:
+    """Fan-out of published messages to subscribers, each behind a bounded queue.
+    
+    A subscriber whose queue is full is too slow to keep up: it is dropped and
+    receives a single None sentinel telling it to disconnect.
+    """
+    
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self.published = 0
+        self.dropped = 0
+    
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+    
+    def publish(self, message):
+        self.published += 1
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._subscribers.discard(queue)
+                self.dropped += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+    
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "published": self.published, "dropped": self.dropped}
+
+market_hub = BroadcastHub(PUSH_QUEUE_SIZE)
+notification_hub = BroadcastHub(PUSH_QUEUE_SIZE)
+
+# Maintained incrementally on insert and on mark-as-read instead of counted per request
+notification_counters = {"unread": 0}
+
+# Rate limiting
+class TokenBuckets:
+    """Token buckets keyed by client, kept in least-recently-used order.
+    
+    A bucket left alone long enough to have refilled completely is indistinguishable
+    from a new one, so it is dropped; memory stays proportional to the active keys.
+    """
+    
+    def __init__(self, max_keys: int, idle_seconds: float):
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self._buckets = OrderedDict()
+        self.evictions = 0
+    
+    def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """Take one token; return 0 when admitted, otherwise the seconds until a token is available"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._evict(now)
+            bucket = self._buckets[key] = [capacity, now]
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / refill_per_second
+    
+    def _evict(self, now: float):
+        while self._buckets:
+            key, (_, updated_at) = next(iter(self._buckets.items()))
+            if now - updated_at < self.idle_seconds and len(self._buckets) < self.max_keys:
+                break
+            del self._buckets[key]
+            self.evictions += 1
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+# Slowest refill of any budget: after this long every bucket is full again
+RATE_LIMIT_IDLE_SECONDS = max(capacity / refill_per_second for capacity, refill_per_second in RATE_LIMITS.values())
+rate_limit_stats = {"rejected": {route_class: 0 for route_class in RATE_LIMITS}, "backend_errors": 0, "untrusted_forwarded": 0}
+
+# Shared state
+class InProcessState:
+    """Shared-state backend for a single worker: values live in this process and
+    published messages are dispatched straight back to it.
+    """
+    
+    name = "in-process"
+    
+    def __init__(self):
+        self._values = {}
+        self._claims = {}
+        self._dispatch = None
+        self.published = 0
+        self.buckets = TokenBuckets(RATE_LIMIT_MAX_KEYS, RATE_LIMIT_IDLE_SECONDS)
+    
+    async def start(self, dispatch):
+        self._dispatch = dispatch
+    
+    async def close(self):
+        pass
+    
+    async def publish(self, channel: str, payload: bytes):
+        self.published += 1
+        self._dispatch(channel, payload)
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._values.get(key)
+    
+    async def set(self, key: str, value: bytes):
+        self._values[key] = value
+    
+    async def incr(self, key: str, delta: int) -> int:
+        self._values[key] = int(self._values.get(key, 0)) + delta
+        return self._values[key]
+    
+    async def claim(self, key: str, ttl_seconds: float) -> bool:
+        now = time.monotonic()
+        if self._claims.get(key, 0) > now:
+            return False
+        if len(self._claims) >= 1024:
+            self._claims = {claimed: expires_at for claimed, expires_at in self._claims.items() if expires_at > now}
+        self._claims[key] = now + ttl_seconds
+        return True
+    
+    async def acquire_leadership(self, role: str, ttl_seconds: float) -> bool:
+        return True
+    
+    async def release_leadership(self, role: str):
+        pass
+    
+    async def take_token(self, key: str, capacity: float, refill_per_second: float) -> float:
+        return self.buckets.take(key, capacity, refill_per_second)
+    
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "worker_id": WORKER_ID,
+            "published": self.published,
+            "rate_limit_keys": len(self.buckets),
+            "rate_limit_evictions": self.buckets.evictions
+        }
+
+class RedisState:
+    """Shared-state backend on a Redis-compatible server, for several workers or hosts.
+    
+    Values are plain keys under SHARED_STATE_PREFIX; messages go through pub/sub and
+    reach every worker, the publishing one included.
+    """
+    
+    name = "redis"
+    
+    # Take the role when nobody holds it, or extend it when this worker already does
+    LEADERSHIP_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("pexpire", KEYS[1], ARGV[2])
+    end
+    return redis.call("set", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) and 1 or 0
+    """
+    
+    RELEASE_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+    
+    # Token bucket on the server clock; the key expires once the bucket would be full again
+    TOKEN_BUCKET_SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local clock = redis.call("time")
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call("hmget", KEYS[1], "tokens", "at")
+    local tokens = capacity
+    if bucket[1] then
+        tokens = math.min(capacity, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+    end
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) / rate
+    end
+    redis.call("hset", KEYS[1], "tokens", tokens, "at", now)
+    redis.call("pexpire", KEYS[1], math.ceil(capacity / rate * 1000))
+    return tostring(retry_after)
+    """
+    
+    def __init__(self, url: str, prefix: str):
+        self.redis = aioredis.from_url(url)
+        self.prefix = prefix
+        self._listener = None
+        self.published = 0
+        self.received = 0
+        self.roles = set()
+    
+    async def start(self, dispatch):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.psubscribe(f"{self.prefix}channel:*")
+        self._listener = asyncio.create_task(self._listen(pubsub, dispatch))
+    
+    async def _listen(self, pubsub, dispatch):
+        channel_prefix = f"{self.prefix}channel:"
+        try:
+            while True:
+                try:
+                    async for message in pubsub.listen():
+                        if message["type"] == "pmessage":
+                            self.received += 1
+                            dispatch(message["channel"].decode().removeprefix(channel_prefix), message["data"])
+                except aioredis.ConnectionError:
+                    # redis-py resubscribes on the next listen(); messages published meanwhile are lost
+                    logger.warning("Shared state subscription lost, reconnecting")
+                    await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+    
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        await self.redis.aclose()
+    
+    async def publish(self, channel: str, payload: bytes):
+        self.published += 1
+        await self.redis.publish(f"{self.prefix}channel:{channel}", payload)
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(self.prefix + key)
+    
+    async def set(self, key: str, value: bytes):
+        await self.redis.set(self.prefix + key, value)
+    
+    async def incr(self, key: str, delta: int) -> int:
+        return await self.redis.incrby(self.prefix + key, delta)
+    
+    async def claim(self, key: str, ttl_seconds: float) -> bool:
+        """True for the first caller on any worker; the key expires after ttl_seconds"""
+        return bool(await self.redis.set(f"{self.prefix}claim:{key}", WORKER_ID, nx=True, px=int(ttl_seconds * 1000)))
+    
+    async def acquire_leadership(self, role: str, ttl_seconds: float) -> bool:
+        # Plain EVAL: the script is tiny and not every Redis-compatible server keeps a script cache
+        held = bool(await self.redis.eval(
+            self.LEADERSHIP_SCRIPT, 1, f"{self.prefix}leader:{role}", WORKER_ID, int(ttl_seconds * 1000)
+        ))
+        if held:
+            self.roles.add(role)
+        else:
+            self.roles.discard(role)
+        return held
+    
+    async def release_leadership(self, role: str):
+        # Only the holder may release; a lease that already expired and moved on is left alone
+        await self.redis.eval(self.RELEASE_SCRIPT, 1, f"{self.prefix}leader:{role}", WORKER_ID)
+        self.roles.discard(role)
+    
+    async def take_token(self, key: str, capacity: float, refill_per_second: float) -> float:
+        return float(await self.redis.eval(
+            self.TOKEN_BUCKET_SCRIPT, 1, f"{self.prefix}ratelimit:{key}", capacity, refill_per_second
+        ))
+    
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "worker_id": WORKER_ID,
+            "published": self.published,
+            "received": self.received,
+            "leader_of": sorted(self.roles)
+        }
+
+def create_shared_state():
+    if not SHARED_STATE_URL:
+        return InProcessState()
+    if aioredis is None:
+        raise RuntimeError("SHARED_STATE_URL is set but the redis package is not installed")
+    return RedisState(SHARED_STATE_URL, SHARED_STATE_PREFIX)
+
+shared_state = create_shared_state()
+
+def cached_payload_response(request: Request, payload: CachedPayload, cache_control: str) -> Response:
+    body, etag, encoding = payload.body, payload.etag, None
+    if payload.variants:
+        accepted = {
+            token.split(";")[0].strip()
+            for token in request.headers.get("accept-encoding", "").split(",")
+            if not token.replace(" ", "").endswith(";q=0")
+        }
+        for candidate in payload.variants:
+            if candidate in accepted:
+                encoding = candidate
+                body, etag = payload.variants[candidate]
+                break
+    
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if payload.variants:
+        headers["Vary"] = "Accept-Encoding"
+    
+    # Any representation of the same content satisfies the client's cached copy
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or tags & payload.etags:
+            return Response(status_code=304, headers=headers)
+    
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # Helper functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def commit_with_retry(session):
+    for attempt in range(1, MONGO_TRANSACTION_ATTEMPTS + 1):
+        try:
+            await session.commit_transaction()
+            return
+        except PyMongoError as e:
+            # The commit may have applied; committing again is safe and tells us which
+            if not e.has_error_label("UnknownTransactionCommitResult") or attempt == MONGO_TRANSACTION_ATTEMPTS:
+                raise
+
+async def run_in_write_transaction(callback):
+    """Await callback(session) in a multi-document transaction, rerunning it on transient errors such as
+    write conflicts; callback(None) when transactions are disabled. The callback must only write through
+    the session, since a conflicting attempt is rolled back and run again from the start."""
+    if not MONGO_USE_TRANSACTIONS:
+        return await callback(None)
+    async with await client.start_session() as session:
+        for attempt in range(1, MONGO_TRANSACTION_ATTEMPTS + 1):
+            session.start_transaction()
+            try:
+                result = await callback(session)
+                await commit_with_retry(session)
+                return result
+            except PyMongoError as e:
+                if session.in_transaction:
+                    await session.abort_transaction()
+                if not e.has_error_label("TransientTransactionError") or attempt == MONGO_TRANSACTION_ATTEMPTS:
+                    raise
+                logger.info("Retrying transaction after a transient error (attempt %d): %s", attempt, e)
+            except BaseException:
+                if session.in_transaction:
+                    await session.abort_transaction()
+                raise
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def bump_platform_stats(increments: dict):
+    """Adjust the platform aggregates; called after the write commits, never inside its transaction"""
+    # Every write touches this one document, so in transactions any two concurrent writes would conflict.
+    # A crash between the commit and this update is corrected by the reconciler.
+    await db.platform_stats.update_one({"_id": PLATFORM_STATS_ID}, {"$inc": increments}, upsert=True)
 
-def create_access_token(data: dict):
+async def compute_platform_stats() -> dict:
+    """Recompute the platform aggregates from scratch (full scans; only for reconciliation)"""
+    user_totals = await db.users.aggregate([{"$group": {
+        "_id": None,
+        "total_users": {"$sum": 1},
+        "total_balance": {"$sum": "$balance"},
+        **{crypto: {"$sum": f"$crypto_balances.{crypto}"} for crypto in SUPPORTED_CRYPTOS}
+    }}]).to_list(1)
+    pending_totals = await db.transactions.aggregate([
+        {"$match": {"status": "pending"}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "amount": {"$sum": "$amount"}}}
+    ]).to_list(1)
+    
+    users = user_totals[0] if user_totals else {}
+    pending = pending_totals[0] if pending_totals else {}
+    return {
+        "total_users": users.get("total_users", 0),
+        "total_balance": users.get("total_balance", 0.0),
+        "crypto_balances": {crypto: users.get(crypto, 0.0) for crypto in SUPPORTED_CRYPTOS},
+        "pending_count": pending.get("count", 0),
+        "pending_amount": pending.get("amount", 0.0)
+    }
+
+def stats_drift(current: dict, expected: dict) -> dict:
+    drift = {}
+    for field in ["total_users", "total_balance", "pending_count", "pending_amount"]:
+        if abs(current.get(field, 0) - expected[field]) > 1e-6:
+            drift[field] = expected[field] - current.get(field, 0)
+    for crypto in SUPPORTED_CRYPTOS:
+        recorded = current.get("crypto_balances", {}).get(crypto, 0)
+        if abs(recorded - expected["crypto_balances"][crypto]) > 1e-6:
+            drift[f"crypto_balances.{crypto}"] = expected["crypto_balances"][crypto] - recorded
+    return drift
+
+async def reconcile_platform_stats() -> dict:
+    """Correct the aggregates by the drift from freshly computed values and return that drift"""
+    current = await db.platform_stats.find_one({"_id": PLATFORM_STATS_ID})
+    expected = await compute_platform_stats()
+    
+    if current is None:
+        # First build: insert, never $inc, so concurrent builders cannot each add the full totals
+        try:
+            await db.platform_stats.insert_one({"_id": PLATFORM_STATS_ID, **expected, "reconciled_at": datetime.utcnow()})
+            return {}
+        except DuplicateKeyError:
+            # Built meanwhile, by another builder or by the upsert of a stats bump: correct that document instead
+            current = await db.platform_stats.find_one({"_id": PLATFORM_STATS_ID}) or {}
+    
+    drift = stats_drift(current, expected)
+    # $inc the drift rather than overwrite, so writes landing during the scans are kept; any they skew is corrected next run
+    await db.platform_stats.update_one(
+        {"_id": PLATFORM_STATS_ID},
+        {"$inc": drift, "$set": {"reconciled_at": datetime.utcnow()}} if drift else {"$set": {"reconciled_at": datetime.utcnow()}}
+    )
+    if drift:
+        logger.warning("Platform stats drifted from the source collections: %s", drift)
+    return drift
+
+stats_reconcile_lock = asyncio.Lock()
+
+async def reconcile_platform_stats_exclusively(skip_if_newer_than: Optional[float] = None) -> Optional[dict]:
+    """Reconcile under the "stats" lease, so no two runs on any worker apply the same drift; None when another run holds it"""
+    if stats_reconcile_lock.locked():
+        return None
+    async with stats_reconcile_lock:
+        if not await shared_state.acquire_leadership("stats", STATS_RECONCILE_LEASE_SECONDS):
+            return None
+        try:
+            if skip_if_newer_than is not None:
+                current = await db.platform_stats.find_one({"_id": PLATFORM_STATS_ID}, {"reconciled_at": 1})
+                if current and current.get("reconciled_at") and current["reconciled_at"] > datetime.utcnow() - timedelta(seconds=skip_if_newer_than):
+                    return {}
+            drift = await reconcile_platform_stats()
+            unread_drift = await reconcile_unread_notifications()
+            if unread_drift:
+                drift["notifications_unread"] = unread_drift
+            return drift
+        finally:
+            await shared_state.release_leadership("stats")
+
+async def run_stats_reconciler():
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_SECONDS)
+        try:
+            # Every worker wakes up, but a run another worker just finished makes the rest skip
+            await reconcile_platform_stats_exclusively(skip_if_newer_than=STATS_RECONCILE_SECONDS / 2)
+        except Exception:
+            logger.exception("Platform stats reconciliation failed")
+
+async def run_password_task(func, *args):
+    """Run a bcrypt operation on the password pool, rejecting with 429 when saturated"""
+    if password_pool_stats["in_flight"] >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE:
+        password_pool_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado, inténtalo de nuevo en unos segundos",
+            headers={"Retry-After": "1"}
+        )
+    
+    submitted_at = time.perf_counter()
+    
+    def task():
+        started_at = time.perf_counter()
+        result = func(*args)
+        return result, started_at - submitted_at, time.perf_counter() - started_at
+    
+    password_pool_stats["in_flight"] += 1
+    try:
+        result, waited, computed = await asyncio.get_running_loop().run_in_executor(password_executor, task)
+    finally:
+        password_pool_stats["in_flight"] -= 1
+    
+    password_pool_stats["completed"] += 1
+    password_pool_stats["wait_seconds_total"] += waited
+    password_pool_stats["wait_seconds_max"] = max(password_pool_stats["wait_seconds_max"], waited)
+    password_pool_stats["compute_seconds_total"] += computed
+    password_pool_stats["compute_seconds_max"] = max(password_pool_stats["compute_seconds_max"], computed)
+    password_histograms["wait"].observe(waited)
+    password_histograms["compute"].observe(computed)
+    return result
+
+async def hash_password(password: str) -> str:
+    return await run_password_task(pwd_context.hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_task(pwd_context.verify, plain_password, hashed_password)
+
+def create_access_token(data: dict, token_type: str = "access", expires_delta: timedelta = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(hours=24)
-    to_encode.update({"exp": expire})
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_MINUTES))
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": token_type})
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm="HS256")
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def issue_tokens(user_id: str) -> dict:
+    return {
+        "access_token": create_access_token(data={"sub": user_id}),
+        "refresh_token": create_access_token(
+            data={"sub": user_id},
+            token_type="refresh",
+            expires_delta=timedelta(days=REFRESH_TOKEN_DAYS)
+        ),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_MINUTES * 60
+    }
+
+def decode_refresh_token(token: str) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") != "refresh" or payload.get("sub") is None or payload.get("jti") in revoked_tokens:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+async def revoke_token(jti: Optional[str], expires_at: float) -> bool:
+    """Revoke locally right away, tell the other workers, and persist for workers started later.
+    
+    Returns whether this call made the revocation: the upsert is the one atomic gate across workers.
+    """
+    if jti is None:
+        return False
+    revoked_tokens.add(jti, expires_at)
+    await shared_state.publish("token_revoked", orjson.dumps({"jti": jti, "expires_at": expires_at}))
+    try:
+        result = await db.revoked_tokens.update_one(
+            {"jti": jti},
+            {"$setOnInsert": {
+                "jti": jti,
+                "expires_at": datetime.utcfromtimestamp(expires_at),
+                "revoked_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False  # a concurrent upsert of the same jti inserted first
+    return result.upserted_id is not None
+
+async def sync_revoked_tokens():
+    """Pull revocations written since the last sync (all unexpired ones on the first call)"""
+    started_at = datetime.utcnow()
+    if revoked_tokens.last_synced_at is None:
+        query = {"expires_at": {"$gt": started_at}}
+    else:
+        # Overlap the window a little so writes in flight during the previous sync are not missed
+        query = {"revoked_at": {"$gte": revoked_tokens.last_synced_at - timedelta(seconds=REVOCATION_SYNC_SECONDS)}}
+    
+    async for revoked in db.revoked_tokens.find(query, {"_id": 0, "jti": 1, "expires_at": 1}):
+        revoked_tokens.add(revoked["jti"], revoked["expires_at"].replace(tzinfo=timezone.utc).timestamp())
+    revoked_tokens.last_synced_at = started_at
+    revoked_tokens.purge()
+
+async def run_revocation_sync():
+    while True:
+        await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+        try:
+            await sync_revoked_tokens()
+        except Exception:
+            logger.exception("Could not sync revoked tokens")
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate_token(credentials.credentials)
+
+def verify_token(token: str) -> tuple:
+    """Return (user id, exp, jti) of a valid access token, verifying each distinct token only once while cached"""
+    # Keyed by digest so raw bearer tokens are never kept in memory
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is not None and claims[1] <= time.time():
+        token_cache.invalidate(digest)
+        claims = None
+    
+    if claims is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+            user_id: str = payload.get("sub")
+            # Refresh tokens are only accepted by /auth/refresh; tokens issued before jti existed count as access tokens
+            if user_id is None or payload.get("type", "access") != "access":
+                raise HTTPException(status_code=401, detail="Invalid token")
+        except jwt.PyJWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        claims = (user_id, payload.get("exp", float("inf")), payload.get("jti"))
+        token_cache.set(digest, claims)
+    
+    # In-memory check on every request, cached or not: no database round trip
+    if claims[2] is not None and claims[2] in revoked_tokens:
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return claims
+
+async def authenticate_token(token: str) -> UserResponse:
+    user_id = verify_token(token)[0]
     
-    user = await db.users.find_one({"id": user_id})
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    
+    user = await db.users.find_one({"id": user_id}, model_projection(UserResponse))
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
+    user_response = UserResponse(**user)
+    user_cache.set(user_id, user_response)
+    return user_response
+
+def encode_cursor(document: dict, sort_field: str, descending: bool = True) -> str:
+    value = document.get(sort_field)
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    position = {"sort": sort_field, "descending": descending, "value": value, "id": document["id"]}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_field: str, descending: bool = True) -> dict:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if position["sort"] != sort_field or position["descending"] is not descending:
+            raise ValueError("cursor belongs to another sort order")
+        value = position["value"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+        return {"value": value, "id": str(position["id"])}
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+model_projections = {}
+
+def model_projection(model) -> dict:
+    """Mongo projection returning exactly the fields of a response model and never _id"""
+    projection = model_projections.get(model)
+    if projection is None:
+        projection = model_projections[model] = {"_id": 0} | {field: 1 for field in model.model_fields}
+    return projection
+
+async def paginate(
+    collection, query: dict, projection: dict, limit: int, after: Optional[str], response: Response,
+    sort_field: str = "created_at", descending: bool = True
+) -> List[dict]:
+    """Keyset pagination over (sort_field, id); sets the next cursor header when more pages exist"""
+    direction = -1 if descending else 1
+    if after:
+        position = decode_cursor(after, sort_field, descending)
+        beyond = "$lt" if descending else "$gt"
+        query = {"$and": [query, {"$or": [
+            {sort_field: {beyond: position["value"]}},
+            {sort_field: position["value"], "id": {beyond: position["id"]}}
+        ]}]}
+    
+    if sort_field not in projection:
+        projection = projection | {sort_field: 1}
+    documents = await collection.find(query, projection).sort([(sort_field, direction), ("id", direction)]).limit(limit + 1).to_list(limit + 1)
+    if len(documents) > limit:
+        documents = documents[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(documents[-1], sort_field, descending)
+    return documents
+
+async def redeem_stream_ticket(ticket: str) -> UserResponse:
+    """Admin check for push channels: the ticket in the query string is short-lived and works only once"""
+    try:
+        payload = jwt.decode(ticket, JWT_SECRET, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid ticket")
+    if payload.get("type") != "stream" or payload.get("sub") is None or payload.get("jti") is None:
+        raise HTTPException(status_code=401, detail="Invalid ticket")
+    if not await shared_state.claim(f"stream_ticket:{payload['jti']}", STREAM_TICKET_SECONDS):
+        raise HTTPException(status_code=401, detail="Ticket already used")
+    
+    user = await db.users.find_one({"id": payload["sub"]}, model_projection(UserResponse))
+    if user is None or not user["is_admin"]:
+        raise HTTPException(status_code=403, detail="Admin access required")
     return UserResponse(**user)
 
+list_adapters = {}
+
+def model_list_response(model, documents: List[dict], response: Response) -> Response:
+    """Validate the documents once and encode them directly, skipping FastAPI's response_model re-validation"""
+    adapter = list_adapters.get(model)
+    if adapter is None:
+        adapter = list_adapters[model] = TypeAdapter(List[model])
+    
+    headers = {NEXT_CURSOR_HEADER: response.headers[NEXT_CURSOR_HEADER]} if NEXT_CURSOR_HEADER in response.headers else None
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(documents)),
+        media_type="application/json",
+        headers=headers
+    )
+
 async def get_admin_user(current_user: UserResponse = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -205,7 +1375,249 @@ async def create_notification(title: str, message: str, notification_type: str =
         user_id=user_id,
         data=data
     )
-    await db.notifications.insert_one(notification.dict())
+    try:
+        notification_queue.put_nowait(notification.dict())
+        outbox_stats["enqueued"] += 1
+        return
+    except asyncio.QueueFull:
+        outbox_stats["inline_writes"] += 1
+    
+    # Outbox saturated: write directly rather than drop the notification, but never fail the request
+    try:
+        await db.notifications.insert_one(notification.dict())
+    except Exception:
+        outbox_stats["failed"] += 1
+        logger.exception("Could not store notification %s", notification.id)
+        return
+    await publish_notifications([notification.dict()])
+
+async def publish_notifications(notifications: List[dict]):
+    """Push stored notifications to the admin feed of every worker and bump the unread counter"""
+    await shared_state.publish("notifications", orjson.dumps([
+        {key: value for key, value in notification.items() if key != "_id"}
+        for notification in notifications
+    ]))
+    await adjust_unread_notifications(sum(1 for notification in notifications if not notification["read"]))
+
+async def adjust_unread_notifications(delta: int):
+    if delta:
+        unread = await shared_state.incr("notifications:unread", delta)
+        await shared_state.publish("unread", str(unread).encode())
+
+async def reconcile_unread_notifications() -> int:
+    """Correct the shared unread counter by its drift from a recount, publish it and return that drift"""
+    recorded = await shared_state.get("notifications:unread")
+    unread = await db.notifications.count_documents({"read": False})
+    # Like the stats, move by the drift rather than overwrite, so increments from other workers are kept
+    drift = unread - int(recorded or 0)
+    await shared_state.publish("unread", str(await shared_state.incr("notifications:unread", drift)).encode())
+    if drift and recorded is not None:
+        logger.warning("Unread notification counter drifted by %d", drift)
+    return drift
+
+def unread_count_message() -> dict:
+    return push_message("unread", orjson.dumps({"unread": notification_counters["unread"]}))
+
+async def flush_notifications(batch: List[dict]):
+    started_at = time.perf_counter()
+    try:
+        await db.notifications.insert_many(batch, ordered=False)
+        outbox_stats["flushed"] += len(batch)
+        await publish_notifications(batch)
+    except Exception:
+        outbox_stats["failed"] += len(batch)
+        logger.exception("Could not flush %d notifications", len(batch))
+    elapsed = time.perf_counter() - started_at
+    outbox_stats["flushes"] += 1
+    outbox_stats["flush_seconds_total"] += elapsed
+    outbox_stats["flush_seconds_max"] = max(outbox_stats["flush_seconds_max"], elapsed)
+
+async def run_notification_writer():
+    """Flush the outbox with insert_many once NOTIFICATION_BATCH_SIZE is reached or NOTIFICATION_FLUSH_SECONDS pass"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await notification_queue.get()]
+        try:
+            deadline = loop.time() + NOTIFICATION_FLUSH_SECONDS
+            while len(batch) < NOTIFICATION_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                getter = asyncio.ensure_future(notification_queue.get())
+                try:
+                    # asyncio.wait_for can swallow a cancellation that races with a queue item
+                    # (Python < 3.12), which would keep this task alive through shutdown
+                    await asyncio.wait((getter,), timeout=timeout)
+                finally:
+                    if getter.done():
+                        batch.append(getter.result())
+                    else:
+                        getter.cancel()
+        except asyncio.CancelledError:
+            # Shutting down: persist what was already taken off the queue
+            await flush_notifications(batch)
+            raise
+        await flush_notifications(batch)
+
+async def drain_notification_outbox():
+    batch = []
+    while not notification_queue.empty():
+        batch.append(notification_queue.get_nowait())
+    for start in range(0, len(batch), NOTIFICATION_BATCH_SIZE):
+        await flush_notifications(batch[start:start + NOTIFICATION_BATCH_SIZE])
+    if batch:
+        logger.info("Flushed %d queued notifications on shutdown", len(batch))
+
+# Market data ticker
+def next_trading_pairs(pairs: List[dict]) -> List[dict]:
+    """Return the next tick as new dicts, leaving the previous snapshot untouched"""
+    return [
+        {
+            **pair,
+            "value": max(1000, pair["value"] + (random.random() - 0.5) * 100),
+            "change": (random.random() - 0.5) * 10,
+            "direction": random.choice(["LONG", "SHORT"]),
+            "leverage": random.choice(["5x", "10x", "20x", "50x"])
+        }
+        for pair in pairs
+    ]
+
+def build_trading_snapshot(pairs: List[dict]) -> CachedPayload:
+    return CachedPayload({"pairs": pairs, "last_updated": datetime.utcnow()})
+
+trading_snapshot = build_trading_snapshot(trading_pairs)
+static_payloads = {}
+
+def refresh_static_payloads():
+    """Re-encode the static responses; call again whenever their source data changes"""
+    static_payloads["crypto_prices"] = CachedPayload(CRYPTO_PRICES, compress=True)
+    static_payloads["crypto_news"] = CachedPayload(CRYPTO_NEWS, compress=True)
+    static_payloads["wallet_addresses"] = CachedPayload(WALLET_ADDRESSES, compress=True)
+
+refresh_static_payloads()
+background_tasks = []
+
+async def run_trading_ticker():
+    """Produce one market snapshot per TRADING_TICK_SECONDS; only the leading worker ticks, every worker serves it"""
+    while True:
+        await asyncio.sleep(TRADING_TICK_SECONDS)
+        try:
+            if not await shared_state.acquire_leadership("market", MARKET_LEADER_TTL_SECONDS):
+                continue
+            # Continue from the last published snapshot, whichever worker produced it
+            pairs = next_trading_pairs(orjson.loads(trading_snapshot.body)["pairs"])
+            body = orjson.dumps({"pairs": pairs, "last_updated": datetime.utcnow()})
+            await shared_state.set("market:snapshot", body)
+            await shared_state.publish("market", body)
+        except Exception:
+            logger.exception("Trading ticker failed to publish a snapshot")
+
+# Shared state messages: applied by every worker, the publishing one included
+def apply_market_snapshot(payload: bytes):
+    global trading_snapshot
+    trading_snapshot = CachedPayload(orjson.loads(payload))
+    market_hub.publish(push_message("snapshot", trading_snapshot.body))
+
+def apply_user_invalidation(payload: bytes):
+    for user_id in payload.decode().split("\n"):
+        user_cache.invalidate(user_id)
+
+def apply_token_revocation(payload: bytes):
+    revoked = orjson.loads(payload)
+    revoked_tokens.add(revoked["jti"], revoked["expires_at"])
+
+def apply_notifications(payload: bytes):
+    for notification in orjson.loads(payload):
+        notification_hub.publish(push_message("notification", orjson.dumps(notification)))
+
+def apply_unread_count(payload: bytes):
+    notification_counters["unread"] = int(payload)
+    notification_hub.publish(unread_count_message())
+
+shared_message_handlers = {
+    "market": apply_market_snapshot,
+    "user_invalidated": apply_user_invalidation,
+    "token_revoked": apply_token_revocation,
+    "notifications": apply_notifications,
+    "unread": apply_unread_count
+}
+
+def dispatch_shared_message(channel: str, payload: bytes):
+    handler = shared_message_handlers.get(channel)
+    if handler is None:
+        return
+    try:
+        handler(payload)
+    except Exception:
+        logger.exception("Could not apply shared state message on %s", channel)
+
+async def invalidate_cached_user(user_id: str):
+    """Drop a user from the cache of every worker after their document changed"""
+    await invalidate_cached_users([user_id])
+
+async def invalidate_cached_users(user_ids: List[str]):
+    # Locally first, so this worker's next request can never read a stale entry
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+    await shared_state.publish("user_invalidated", "\n".join(user_ids).encode())
+
+def push_message(event: str, body: bytes) -> dict:
+    """Encode a push payload once for every WebSocket and SSE subscriber"""
+    return {"text": body.decode(), "sse": b"event: " + event.encode() + b"\ndata: " + body + b"\n\n"}
+
+async def pump_websocket(websocket: WebSocket, hub: BroadcastHub, initial: Optional[dict] = None):
+    """Forward hub messages to an accepted WebSocket until either side goes away"""
+    queue = hub.subscribe()
+    receiver = asyncio.create_task(websocket.receive())
+    try:
+        if initial is not None:
+            await websocket.send_text(initial["text"])
+        while True:
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+                # Clients have nothing to say on push channels; ignore anything they send
+                receiver = asyncio.create_task(websocket.receive())
+                continue
+            message = getter.result()
+            if message is None:
+                # Dropped for being too slow; 1013 asks the client to retry later
+                await websocket.close(code=1013)
+                break
+            await websocket.send_text(message["text"])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        hub.unsubscribe(queue)
+
+async def stream_events(hub: BroadcastHub, initial: Optional[dict] = None):
+    """Server-Sent Events generator over a hub subscription, with keepalive comments"""
+    queue = hub.subscribe()
+    try:
+        if initial is not None:
+            yield initial["sse"]
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if message is None:
+                break
+            yield message["sse"]
+    finally:
+        hub.unsubscribe(queue)
+
+def event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Routes
 @api_router.get("/")
@@ -216,12 +1628,12 @@ async def root():
 @api_router.post("/auth/register", response_model=dict)
 async def register(user_data: UserCreate):
     # Check if user exists
-    existing_user = await db.users.find_one({"email": user_data.email})
+    existing_user = await db.users.find_one({"email": user_data.email}, {"_id": 1})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user = User(
         name=user_data.name,
         email=user_data.email,
@@ -233,7 +1645,12 @@ async def register(user_data: UserCreate):
     if user_count == 0:
         user.is_admin = True
     
-    await db.users.insert_one(user.dict())
+    try:
+        await db.users.insert_one(user.dict())
+    except DuplicateKeyError:
+        # A concurrent registration with the same email passed the check above first
+        raise HTTPException(status_code=400, detail="Email already registered")
+    await bump_platform_stats({"total_users": 1})
     
     # Create notification for admin
     await create_notification(
@@ -244,29 +1661,61 @@ async def register(user_data: UserCreate):
         data={"user_name": user.name, "user_email": user.email}
     )
     
-    # Create access token
-    access_token = create_access_token(data={"sub": user.id})
-    
+    # Create access and refresh tokens
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
+        **issue_tokens(user.id),
         "user": UserResponse(**user.dict())
     }
 
 @api_router.post("/auth/login", response_model=dict)
 async def login(login_data: UserLogin):
-    user = await db.users.find_one({"email": login_data.email})
-    if not user or not verify_password(login_data.password, user["password_hash"]):
+    # The only read that needs password_hash
+    user = await db.users.find_one({"email": login_data.email}, model_projection(UserResponse) | {"password_hash": 1})
+    if not user or not await verify_password(login_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    access_token = create_access_token(data={"sub": user["id"]})
-    
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
+        **issue_tokens(user["id"]),
         "user": UserResponse(**user)
     }
 
+@api_router.post("/auth/refresh")
+async def refresh_tokens(refresh_data: RefreshRequest):
+    payload = decode_refresh_token(refresh_data.refresh_token)
+    
+    # Rotation: every refresh token can be used exactly once, even when replayed to another worker at the same time
+    if not await revoke_token(payload.get("jti"), payload["exp"]):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return issue_tokens(payload["sub"])
+
+@api_router.post("/auth/logout")
+async def logout(
+    logout_data: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    # Access tokens are short-lived, so logout usually arrives with an expired one: check only the signature
+    try:
+        access = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=["HS256"], options={"verify_exp": False})
+    except jwt.PyJWTError:
+        access = None
+    if access is not None and access.get("type", "access") != "access":
+        access = None
+    if access is not None and access.get("exp", float("inf")) > time.time():
+        await revoke_token(access.get("jti"), access["exp"])
+    
+    refresh = None
+    if logout_data and logout_data.refresh_token:
+        try:
+            refresh = decode_refresh_token(logout_data.refresh_token)
+        except HTTPException:
+            pass  # Already invalid: nothing left to revoke
+    if refresh is not None:
+        await revoke_token(refresh.get("jti"), refresh["exp"])
+    elif access is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    return {"message": "Sesión cerrada correctamente"}
+
 @api_router.get("/auth/me", response_model=UserResponse)
 async def get_me(current_user: UserResponse = Depends(get_current_user)):
     return current_user
@@ -294,6 +1743,7 @@ async def crypto_deposit(deposit_data: DepositRequest, current_user: UserRespons
     )
     
     await db.transactions.insert_one(transaction.dict())
+    await bump_platform_stats({"pending_count": 1, "pending_amount": transaction.amount})
     
     # Create notification for admin - DO NOT UPDATE USER BALANCE YET
     await create_notification(
@@ -326,6 +1776,7 @@ async def voucher_deposit(voucher_data: VoucherRequest, current_user: UserRespon
     )
     
     await db.transactions.insert_one(transaction.dict())
+    await bump_platform_stats({"pending_count": 1, "pending_amount": transaction.amount})
     
     # Create notification for admin - DO NOT UPDATE BALANCE YET
     await create_notification(
@@ -347,11 +1798,6 @@ async def voucher_deposit(voucher_data: VoucherRequest, current_user: UserRespon
 # Withdrawal routes
 @api_router.post("/withdrawals")
 async def create_withdrawal(withdrawal_data: WithdrawalRequest, current_user: UserResponse = Depends(get_current_user)):
-    user = await db.users.find_one({"id": current_user.id})
-    
-    if withdrawal_data.amount > user["balance"]:
-        raise HTTPException(status_code=400, detail="Saldo insuficiente")
-    
     if withdrawal_data.amount < 10:
         raise HTTPException(status_code=400, detail="Monto mínimo de retiro es €10")
     
@@ -373,13 +1819,29 @@ async def create_withdrawal(withdrawal_data: WithdrawalRequest, current_user: Us
         status="pending"
     )
     
-    await db.transactions.insert_one(transaction.dict())
+    async def debit(session):
+        # Debit only if the balance still covers it, so concurrent withdrawals cannot overdraw
+        result = await db.users.update_one(
+            {"id": current_user.id, "balance": {"$gte": withdrawal_data.amount}},
+            {"$inc": {"balance": -withdrawal_data.amount}},
+            session=session
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=400, detail="Saldo insuficiente")
+        
+        try:
+            await db.transactions.insert_one(transaction.dict(), session=session)
+        except Exception:
+            if session is None:
+                # No transaction to roll back: return the funds before failing
+                await db.users.update_one({"id": current_user.id}, {"$inc": {"balance": withdrawal_data.amount}})
+            raise
     
-    # Update user balance
-    await db.users.update_one(
-        {"id": current_user.id},
-        {"$inc": {"balance": -withdrawal_data.amount}}
+    await run_in_write_transaction(debit)
+    await bump_platform_stats(
+        {"total_balance": -withdrawal_data.amount, "pending_count": 1, "pending_amount": withdrawal_data.amount}
     )
+    await invalidate_cached_user(current_user.id)
     
     # Create notification for admin
     await create_notification(
@@ -399,59 +1861,117 @@ async def create_withdrawal(withdrawal_data: WithdrawalRequest, current_user: Us
 
 # Transaction routes
 @api_router.get("/transactions", response_model=List[Transaction])
-async def get_transactions(current_user: UserResponse = Depends(get_current_user)):
-    transactions = await db.transactions.find({"user_id": current_user.id}).sort("created_at", -1).to_list(100)
-    return [Transaction(**t) for t in transactions]
+async def get_transactions(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    transactions = await paginate(db.transactions, {"user_id": current_user.id}, model_projection(Transaction), limit, after, response)
+    return model_list_response(Transaction, transactions, response)
 
 # Trading routes
 @api_router.get("/trading/data")
-async def get_trading_data():
-    # Update trading data with random fluctuations
-    for pair in trading_pairs:
-        fluctuation = (random.random() - 0.5) * 100
-        pair["value"] = max(1000, pair["value"] + fluctuation)
-        pair["change"] = (random.random() - 0.5) * 10
-        pair["direction"] = random.choice(["LONG", "SHORT"])
-        pair["leverage"] = random.choice(["5x", "10x", "20x", "50x"])
-    
-    return {"pairs": trading_pairs, "last_updated": datetime.utcnow()}
+async def get_trading_data(request: Request):
+    # Every client within a tick gets the same pre-serialized snapshot
+    return cached_payload_response(request, trading_snapshot, f"public, max-age={int(TRADING_TICK_SECONDS)}")
+
+@api_router.websocket("/trading/ws")
+async def trading_websocket(websocket: WebSocket):
+    await websocket.accept()
+    await pump_websocket(websocket, market_hub, push_message("snapshot", trading_snapshot.body))
+
+@api_router.get("/trading/stream")
+async def trading_stream():
+    """SSE fallback for clients that cannot open a WebSocket"""
+    return event_stream_response(stream_events(market_hub, push_message("snapshot", trading_snapshot.body)))
 
 # Admin routes
 @api_router.get("/admin/stats")
 async def get_admin_stats(current_user: UserResponse = Depends(get_admin_user)):
-    total_users = await db.users.estimated_document_count()
-    
-    # Get total balance
-    pipeline = [{"$group": {"_id": None, "total_balance": {"$sum": "$balance"}}}]
-    result = await db.users.aggregate(pipeline).to_list(1)
-    total_balance = result[0]["total_balance"] if result else 0
+    stats = await db.platform_stats.find_one({"_id": PLATFORM_STATS_ID}, {"_id": 0, "reconciled_at": 0})
+    if stats is None:
+        await reconcile_platform_stats_exclusively()
+        stats = await db.platform_stats.find_one({"_id": PLATFORM_STATS_ID}, {"_id": 0, "reconciled_at": 0})
+    if stats is None:
+        # Still being built by another worker: answer from the source collections this once
+        stats = await compute_platform_stats()
     
     return {
-        "total_users": total_users,
-        "total_balance": total_balance
+        "total_users": stats.get("total_users", 0),
+        "total_balance": stats.get("total_balance", 0.0),
+        "crypto_balances": {crypto: stats.get("crypto_balances", {}).get(crypto, 0.0) for crypto in SUPPORTED_CRYPTOS},
+        "pending_count": stats.get("pending_count", 0),
+        "pending_amount": stats.get("pending_amount", 0.0)
     }
 
+@api_router.post("/admin/stats/reconcile")
+async def reconcile_admin_stats(current_user: UserResponse = Depends(get_admin_user)):
+    drift = await reconcile_platform_stats_exclusively()
+    if drift is None:
+        raise HTTPException(status_code=409, detail="Ya hay una reconciliación de estadísticas en curso")
+    return {"message": "Estadísticas recalculadas", "drift": drift}
+
 @api_router.get("/admin/users", response_model=List[UserResponse])
-async def get_all_users(current_user: UserResponse = Depends(get_admin_user)):
-    users = await db.users.find({}).to_list(100)
-    return [UserResponse(**u) for u in users]
+async def get_all_users(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    users = await paginate(reporting_db.users, {}, model_projection(UserResponse), limit, after, response)
+    return model_list_response(UserResponse, users, response)
 
-@api_router.put("/admin/transactions/{transaction_id}/approve")
-async def approve_transaction(transaction_id: str, current_user: UserResponse = Depends(get_admin_user)):
-    # Find the transaction
-    transaction = await db.transactions.find_one({"id": transaction_id})
-    if not transaction:
-        raise HTTPException(status_code=404, detail="Transacción no encontrada")
+# Each sort is served by the users_*_id index of the same field
+USER_SEARCH_SORTS = {"created_at": "created_at", "email": "email_lower", "name": "name_lower", "balance": "balance"}
+
+@api_router.get("/admin/users/search", response_model=List[UserResponse])
+async def search_users(
+    response: Response,
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Prefijo de email o nombre"),
+    match: Optional[str] = Query(None, pattern="^(email|name)$", description="Campo del prefijo; por defecto email si q contiene @"),
+    is_admin: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_balance: Optional[float] = None,
+    max_balance: Optional[float] = None,
+    sort: Optional[str] = Query(None, pattern="^(created_at|email|name|balance)$"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    clauses = []
+    if q:
+        # One anchored, case-sensitive regex on a lowercased field: an index range scan already in sort order
+        if match is None:
+            match = "email" if "@" in q else "name"
+        clauses.append({USER_SEARCH_SORTS[match]: {"$regex": "^" + re.escape(q.strip().lower())}})
+    if is_admin is not None:
+        clauses.append({"is_admin": is_admin})
+    if created_from or created_to:
+        clauses.append({"created_at": {
+            bound: value for bound, value in (("$gte", created_from), ("$lt", created_to)) if value is not None
+        }})
+    if min_balance is not None or max_balance is not None:
+        clauses.append({"balance": {
+            bound: value for bound, value in (("$gte", min_balance), ("$lte", max_balance)) if value is not None
+        }})
+    query = {"$and": clauses} if clauses else {}
     
-    if transaction["status"] != "pending":
-        raise HTTPException(status_code=400, detail="La transacción ya ha sido procesada")
+    # A prefix search reads best in the order of the field it matched
+    if sort is None:
+        sort = match if q else "created_at"
+    if order is None:
+        order = "desc" if sort in ("created_at", "balance") else "asc"
     
-    # Update transaction status
-    await db.transactions.update_one(
-        {"id": transaction_id},
-        {"$set": {"status": "completed"}}
+    users = await paginate(
+        reporting_db.users, query, model_projection(UserResponse), limit, after, response,
+        sort_field=USER_SEARCH_SORTS[sort], descending=order == "desc"
     )
-    
+    return model_list_response(UserResponse, users, response)
+
+def transaction_crypto_type(transaction: dict) -> Optional[str]:
     # Extract crypto type from transaction method (e.g., "Crypto (BTC)" -> "BTC")
     crypto_type = None
     if transaction["method"].startswith("Crypto (") and transaction["method"].endswith(")"):
@@ -459,33 +1979,60 @@ async def approve_transaction(transaction_id: str, current_user: UserResponse =
     elif transaction["method"] == "CryptoVoucher":
         # For vouchers, we need to determine the crypto type from transaction details or default to USDT
         crypto_type = "USDT"  # Default for vouchers
+    return crypto_type
+
+def balance_increments(transaction: dict, crypto_type: Optional[str]) -> dict:
+    # Legacy balance always moves; the crypto-specific balance only for supported cryptos
+    increments = {"balance": transaction["amount"]}
+    if crypto_type and crypto_type in SUPPORTED_CRYPTOS:
+        increments[f"crypto_balances.{crypto_type}"] = transaction["amount"]
+    return increments
+
+async def claim_pending_transaction(transaction_id: str, new_status: str, session=None) -> dict:
+    """Atomically move a transaction out of "pending"; only one concurrent caller can win"""
+    transaction = await db.transactions.find_one_and_update(
+        {"id": transaction_id, "status": "pending"},
+        {"$set": {"status": new_status}},
+        projection={"_id": 0},
+        session=session
+    )
+    if transaction is not None:
+        return transaction
     
-    # Update user balance (both legacy and crypto-specific)
-    if crypto_type and crypto_type in ["BTC", "ETH", "USDT", "BNB", "ADA"]:
-        # Update crypto-specific balance
-        await db.users.update_one(
-            {"id": transaction["user_id"]},
-            {
-                "$inc": {
-                    "balance": transaction["amount"],  # Legacy balance
-                    f"crypto_balances.{crypto_type}": transaction["amount"]  # Crypto-specific balance
-                }
-            }
-        )
-    else:
-        # Fallback to legacy balance only
-        await db.users.update_one(
+    # Lost the race or never existed: only the failure path pays for this read
+    if await db.transactions.count_documents({"id": transaction_id}, limit=1, session=session):
+        raise HTTPException(status_code=400, detail="La transacción ya ha sido procesada")
+    raise HTTPException(status_code=404, detail="Transacción no encontrada")
+
+@api_router.put("/admin/transactions/{transaction_id}/approve")
+async def approve_transaction(transaction_id: str, current_user: UserResponse = Depends(get_admin_user)):
+    async def credit(session):
+        transaction = await claim_pending_transaction(transaction_id, "completed", session)
+        crypto_type = transaction_crypto_type(transaction)
+        increments = balance_increments(transaction, crypto_type)
+        
+        # Credit the user and read back the name for the notification in the same round trip
+        user = await db.users.find_one_and_update(
             {"id": transaction["user_id"]},
-            {"$inc": {"balance": transaction["amount"]}}
+            {"$inc": increments},
+            projection={"_id": 0, "name": 1},
+            session=session
         )
+        return transaction, crypto_type, increments, user
     
-    # Get user info
-    user = await db.users.find_one({"id": transaction["user_id"]})
+    transaction, crypto_type, increments, user = await run_in_write_transaction(credit)
+    await bump_platform_stats(
+        {
+            "total_balance" if field == "balance" else field: amount
+            for field, amount in increments.items()
+        } | {"pending_count": -1, "pending_amount": -transaction["amount"]}
+    )
+    await invalidate_cached_user(transaction["user_id"])
     
     # Create notification
     await create_notification(
         title="Depósito Aprobado",
-        message=f"Se ha aprobado el depósito de €{transaction['amount']} ({crypto_type or 'General'}) para {user['name']}",
+        message=f"Se ha aprobado el depósito de €{transaction['amount']} ({crypto_type or 'General'}) para {user['name'] if user else transaction['user_id']}",
         notification_type="deposit_approved",
         user_id=transaction["user_id"],
         data={
@@ -499,27 +2046,16 @@ async def approve_transaction(transaction_id: str, current_user: UserResponse =
 
 @api_router.put("/admin/transactions/{transaction_id}/reject")
 async def reject_transaction(transaction_id: str, current_user: UserResponse = Depends(get_admin_user)):
-    # Find the transaction
-    transaction = await db.transactions.find_one({"id": transaction_id})
-    if not transaction:
-        raise HTTPException(status_code=404, detail="Transacción no encontrada")
-    
-    if transaction["status"] != "pending":
-        raise HTTPException(status_code=400, detail="La transacción ya ha sido procesada")
-    
-    # Update transaction status
-    await db.transactions.update_one(
-        {"id": transaction_id},
-        {"$set": {"status": "failed"}}
-    )
+    transaction = await claim_pending_transaction(transaction_id, "failed")
+    await bump_platform_stats({"pending_count": -1, "pending_amount": -transaction["amount"]})
     
     # Get user info
-    user = await db.users.find_one({"id": transaction["user_id"]})
+    user = await db.users.find_one({"id": transaction["user_id"]}, {"_id": 0, "name": 1})
     
     # Create notification
     await create_notification(
         title="Depósito Rechazado",
-        message=f"Se ha rechazado el depósito de €{transaction['amount']} para {user['name']}",
+        message=f"Se ha rechazado el depósito de €{transaction['amount']} para {user['name'] if user else transaction['user_id']}",
         notification_type="deposit_rejected",
         user_id=transaction["user_id"],
         data={
@@ -530,94 +2066,189 @@ async def reject_transaction(transaction_id: str, current_user: UserResponse = D
     
     return {"message": "Transacción rechazada"}
 
+async def claim_pending_transactions(transaction_ids: List[str], new_status: str, session=None) -> tuple:
+    """Move many transactions out of "pending" in one write; returns the claimed documents and the failures by id"""
+    # The batch id tells this call's claims apart from concurrent ones on the same ids
+    batch_id = str(uuid.uuid4())
+    await db.transactions.update_many(
+        {"id": {"$in": transaction_ids}, "status": "pending"},
+        {"$set": {"status": new_status, "batch_id": batch_id}},
+        session=session
+    )
+    claimed = await db.transactions.find(
+        {"id": {"$in": transaction_ids}, "batch_id": batch_id}, {"_id": 0, "batch_id": 0}, session=session
+    ).to_list(None)
+    
+    failures = {}
+    unclaimed = set(transaction_ids) - {transaction["id"] for transaction in claimed}
+    if unclaimed:
+        existing = await db.transactions.find({"id": {"$in": list(unclaimed)}}, {"_id": 0, "id": 1}, session=session).to_list(None)
+        existing_ids = {transaction["id"] for transaction in existing}
+        failures = {
+            transaction_id: "already_processed" if transaction_id in existing_ids else "not_found"
+            for transaction_id in unclaimed
+        }
+    return claimed, failures
+
+async def settle_transactions(transaction_ids: List[str], approve: bool) -> List[dict]:
+    """Bulk counterpart of approve_transaction/reject_transaction; returns one result per requested id"""
+    transaction_ids = list(dict.fromkeys(transaction_ids))
+    async def settle(session):
+        claimed, failures = await claim_pending_transactions(transaction_ids, "completed" if approve else "failed", session)
+        
+        stats = {"pending_count": -len(claimed), "pending_amount": -sum(transaction["amount"] for transaction in claimed)}
+        crypto_types = {transaction["id"]: transaction_crypto_type(transaction) for transaction in claimed}
+        if approve and claimed:
+            # One $inc per user, however many of their deposits are in the batch
+            user_increments = {}
+            for transaction in claimed:
+                increments = user_increments.setdefault(transaction["user_id"], {})
+                for field, amount in balance_increments(transaction, crypto_types[transaction["id"]]).items():
+                    increments[field] = increments.get(field, 0) + amount
+                    stats_field = "total_balance" if field == "balance" else field
+                    stats[stats_field] = stats.get(stats_field, 0) + amount
+            await db.users.bulk_write(
+                [UpdateOne({"id": user_id}, {"$inc": increments}) for user_id, increments in user_increments.items()],
+                ordered=False,
+                session=session
+            )
+        return claimed, failures, stats, crypto_types
+    
+    claimed, failures, stats, crypto_types = await run_in_write_transaction(settle)
+    
+    user_ids = list(dict.fromkeys(transaction["user_id"] for transaction in claimed))
+    if claimed:
+        await bump_platform_stats(stats)
+        if approve:
+            await invalidate_cached_users(user_ids)
+        
+        users = await db.users.find({"id": {"$in": user_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+        names = {user["id"]: user["name"] for user in users}
+        notifications = []
+        for transaction in claimed:
+            name = names.get(transaction["user_id"], transaction["user_id"])
+            if approve:
+                crypto_type = crypto_types[transaction["id"]]
+                notification = Notification(
+                    title="Depósito Aprobado",
+                    message=f"Se ha aprobado el depósito de €{transaction['amount']} ({crypto_type or 'General'}) para {name}",
+                    type="deposit_approved",
+                    user_id=transaction["user_id"],
+                    data={"amount": transaction["amount"], "crypto_type": crypto_type, "transaction_id": transaction["id"]}
+                )
+            else:
+                notification = Notification(
+                    title="Depósito Rechazado",
+                    message=f"Se ha rechazado el depósito de €{transaction['amount']} para {name}",
+                    type="deposit_rejected",
+                    user_id=transaction["user_id"],
+                    data={"amount": transaction["amount"], "transaction_id": transaction["id"]}
+                )
+            notifications.append(notification.dict())
+        await flush_notifications(notifications)
+    
+    settled = "approved" if approve else "rejected"
+    return [
+        {"transaction_id": transaction_id, "status": failures.get(transaction_id, settled)}
+        | ({"crypto_type": crypto_types[transaction_id]} if approve and transaction_id in crypto_types else {})
+        for transaction_id in transaction_ids
+    ]
+
+@api_router.post("/admin/transactions/bulk-approve")
+async def bulk_approve_transactions(request: BulkTransactionRequest, current_user: UserResponse = Depends(get_admin_user)):
+    results = await settle_transactions(request.transaction_ids, approve=True)
+    approved = sum(1 for result in results if result["status"] == "approved")
+    return {"message": f"{approved} de {len(results)} transacciones aprobadas", "results": results}
+
+@api_router.post("/admin/transactions/bulk-reject")
+async def bulk_reject_transactions(request: BulkTransactionRequest, current_user: UserResponse = Depends(get_admin_user)):
+    results = await settle_transactions(request.transaction_ids, approve=False)
+    rejected = sum(1 for result in results if result["status"] == "rejected")
+    return {"message": f"{rejected} de {len(results)} transacciones rechazadas", "results": results}
+
 # Get crypto prices for dashboard
 @api_router.get("/crypto/prices")
-async def get_crypto_prices():
-    # Simulated crypto prices - in real app you'd fetch from CoinGecko or similar
-    return {
-        "BTC": {
-            "price": 43250.67,
-            "change_24h": 2.34,
-            "symbol": "₿"
-        },
-        "ETH": {
-            "price": 2658.91,
-            "change_24h": -1.23,
-            "symbol": "Ξ"
-        },
-        "USDT": {
-            "price": 1.00,
-            "change_24h": 0.01,
-            "symbol": "₮"
-        },
-        "BNB": {
-            "price": 312.45,
-            "change_24h": 4.56,
-            "symbol": "BNB"
-        },
-        "ADA": {
-            "price": 0.48,
-            "change_24h": -2.1,
-            "symbol": "₳"
-        }
-    }
+async def get_crypto_prices(request: Request):
+    return cached_payload_response(request, static_payloads["crypto_prices"], STATIC_CACHE_CONTROL)
 
 # Get crypto news
 @api_router.get("/crypto/news")
-async def get_crypto_news():
-    # Simulated news - in real app you'd fetch from news API
-    return [
-        {
-            "id": "1",
-            "title": "Bitcoin alcanza nuevo máximo mensual",
-            "summary": "El precio del Bitcoin supera los $43,000 impulsado por mayor adopción institucional",
-            "date": "2024-01-15T10:30:00Z",
-            "source": "CryptoNews"
-        },
-        {
-            "id": "2", 
-            "title": "Ethereum prepara nueva actualización",
-            "summary": "La red Ethereum planea implementar mejoras de escalabilidad para reducir fees",
-            "date": "2024-01-14T15:45:00Z",
-            "source": "ETH Today"
-        },
-        {
-            "id": "3",
-            "title": "Regulaciones crypto en Europa",
-            "summary": "La UE finaliza el marco regulatorio MiCA para criptomonedas",
-            "date": "2024-01-13T09:15:00Z",
-            "source": "Regulatory Watch"
-        }
-    ]
+async def get_crypto_news(request: Request):
+    return cached_payload_response(request, static_payloads["crypto_news"], STATIC_CACHE_CONTROL)
 
 @api_router.get("/admin/notifications", response_model=List[Notification])
-async def get_notifications(current_user: UserResponse = Depends(get_admin_user)):
-    notifications = await db.notifications.find({}).sort("created_at", -1).limit(50).to_list(50)
-    return [Notification(**n) for n in notifications]
+async def get_notifications(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    notifications = await paginate(reporting_db.notifications, {}, model_projection(Notification), limit, after, response)
+    return model_list_response(Notification, notifications, response)
 
 @api_router.put("/admin/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, current_user: UserResponse = Depends(get_admin_user)):
-    result = await db.notifications.update_one(
+    # The previous state tells us whether the unread counter has to move
+    previous = await db.notifications.find_one_and_update(
         {"id": notification_id},
-        {"$set": {"read": True}}
+        {"$set": {"read": True}},
+        projection={"_id": 0, "read": 1}
     )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Notificación no encontrada")
     
+    if not previous.get("read"):
+        await adjust_unread_notifications(-1)
+    
     return {"message": "Notificación marcada como leída"}
 
+@api_router.get("/admin/notifications/unread-count")
+async def get_unread_notification_count(current_user: UserResponse = Depends(get_admin_user)):
+    return {"unread": notification_counters["unread"]}
+
+@api_router.post("/admin/notifications/stream-ticket")
+async def create_stream_ticket(current_user: UserResponse = Depends(get_admin_user)):
+    """Ticket for one connection to the notification stream or WebSocket; fetch a new one to reconnect"""
+    ticket = create_access_token(
+        data={"sub": current_user.id}, token_type="stream", expires_delta=timedelta(seconds=STREAM_TICKET_SECONDS)
+    )
+    return {"ticket": ticket, "expires_in": STREAM_TICKET_SECONDS}
+
+@api_router.websocket("/admin/notifications/ws")
+async def notifications_websocket(websocket: WebSocket, ticket: str):
+    try:
+        await redeem_stream_ticket(ticket)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    await pump_websocket(websocket, notification_hub, unread_count_message())
+
+@api_router.get("/admin/notifications/stream")
+async def notifications_stream(ticket: str):
+    """SSE feed of new notifications and unread count changes (admin only)"""
+    await redeem_stream_ticket(ticket)
+    return event_stream_response(stream_events(notification_hub, unread_count_message()))
+
 @api_router.put("/admin/users/{user_id}/balance")
 async def update_user_balance(user_id: str, new_balance: float, current_user: UserResponse = Depends(get_admin_user)):
-    result = await db.users.update_one(
-        {"id": user_id},
-        {"$set": {"balance": new_balance}}
-    )
-    
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    async def set_balance(session):
+        # The previous balance gives the delta for the platform totals
+        user = await db.users.find_one_and_update(
+            {"id": user_id},
+            {"$set": {"balance": new_balance}},
+            projection={"_id": 0, "name": 1, "balance": 1},
+            session=session
+        )
+        
+        if user is None:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        return user
     
-    user = await db.users.find_one({"id": user_id})
+    user = await run_in_write_transaction(set_balance)
+    await bump_platform_stats({"total_balance": new_balance - user.get("balance", 0.0)})
+    await invalidate_cached_user(user_id)
     
     # Create notification
     await create_notification(
@@ -634,15 +2265,86 @@ async def update_user_balance(user_id: str, new_balance: float, current_user: Us
     return {"message": "Balance actualizado exitosamente"}
 
 @api_router.get("/admin/transactions", response_model=List[Transaction])
-async def get_all_transactions(current_user: UserResponse = Depends(get_admin_user)):
-    transactions = await db.transactions.find({}).sort("created_at", -1).to_list(100)
-    return [Transaction(**t) for t in transactions]
+async def get_all_transactions(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    transactions = await paginate(reporting_db.transactions, {}, model_projection(Transaction), limit, after, response)
+    return model_list_response(Transaction, transactions, response)
+
+async def stream_transactions_export(query: dict, export_format: str):
+    """Yield the export in chunks of EXPORT_BATCH_SIZE rows so memory stays flat regardless of result size"""
+    fields = list(Transaction.model_fields)
+    cursor = reporting_db.transactions.find(query, {field: 1 for field in fields} | {"_id": 0})
+    cursor = cursor.sort([("created_at", 1), ("id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    if export_format == "csv":
+        writer.writeheader()
+    
+    rows = 0
+    started_at = time.perf_counter()
+    try:
+        async for document in cursor:
+            if export_format == "csv":
+                writer.writerow({key: value.isoformat() if isinstance(value, datetime) else value for key, value in document.items()})
+            else:
+                buffer.write(orjson.dumps(document).decode())
+                buffer.write("\n")
+            rows += 1
+            if rows % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        elapsed = time.perf_counter() - started_at
+        logger.info(
+            "Transaction export (%s) finished: %d rows in %.2fs (%.0f rows/s)",
+            export_format, rows, elapsed, rows / elapsed if elapsed else 0.0
+        )
+
+@api_router.get("/admin/transactions/export")
+async def export_transactions(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    transaction_status: Optional[str] = Query(None, alias="status"),
+    transaction_type: Optional[str] = Query(None, alias="type"),
+    user_id: Optional[str] = None,
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """Stream every transaction matching the filters as NDJSON or CSV (admin only)"""
+    query = {}
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = start
+        if end:
+            query["created_at"]["$lt"] = end
+    if transaction_status:
+        query["status"] = transaction_status
+    if transaction_type:
+        query["type"] = transaction_type
+    if user_id:
+        query["user_id"] = user_id
+    
+    filename = f"transactions-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream_transactions_export(query, format),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # Message endpoints
 @api_router.post("/admin/messages")
 async def send_message(message_data: MessageCreate, current_user: UserResponse = Depends(get_admin_user)):
     # Verify target user exists
-    target_user = await db.users.find_one({"id": message_data.to_user_id})
+    target_user = await db.users.find_one({"id": message_data.to_user_id}, {"_id": 1})
     if not target_user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
@@ -669,9 +2371,14 @@ async def send_message(message_data: MessageCreate, current_user: UserResponse =
     return {"message": "Mensaje enviado exitosamente", "message_id": message.id}
 
 @api_router.get("/messages", response_model=List[Message])
-async def get_user_messages(current_user: UserResponse = Depends(get_current_user)):
-    messages = await db.messages.find({"to_user_id": current_user.id}).sort("created_at", -1).to_list(50)
-    return [Message(**m) for m in messages]
+async def get_user_messages(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    messages = await paginate(db.messages, {"to_user_id": current_user.id}, model_projection(Message), limit, after, response)
+    return model_list_response(Message, messages, response)
 
 @api_router.put("/messages/{message_id}/read")
 async def mark_message_read(message_id: str, current_user: UserResponse = Depends(get_current_user)):
@@ -721,16 +2428,26 @@ async def create_support_ticket(ticket_data: SupportTicketRequest, current_user:
     }
 
 @api_router.get("/support/tickets", response_model=List[SupportTicket])
-async def get_user_support_tickets(current_user: UserResponse = Depends(get_current_user)):
-    """Get all support tickets for the current user"""
-    tickets = await db.support_tickets.find({"user_id": current_user.id}).sort("created_at", -1).to_list(50)
-    return [SupportTicket(**ticket) for ticket in tickets]
+async def get_user_support_tickets(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Get support tickets for the current user, newest first"""
+    tickets = await paginate(db.support_tickets, {"user_id": current_user.id}, model_projection(SupportTicket), limit, after, response)
+    return model_list_response(SupportTicket, tickets, response)
 
 @api_router.get("/admin/support/tickets", response_model=List[SupportTicket])
-async def get_all_support_tickets(current_user: UserResponse = Depends(get_admin_user)):
-    """Get all support tickets (admin only)"""
-    tickets = await db.support_tickets.find({}).sort("created_at", -1).to_list(100)
-    return [SupportTicket(**ticket) for ticket in tickets]
+async def get_all_support_tickets(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """Get support tickets from all users, newest first (admin only)"""
+    tickets = await paginate(reporting_db.support_tickets, {}, model_projection(SupportTicket), limit, after, response)
+    return model_list_response(SupportTicket, tickets, response)
 
 @api_router.put("/admin/support/tickets/{ticket_id}/status")
 async def update_ticket_status(ticket_id: str, status: str, current_user: UserResponse = Depends(get_admin_user)):
@@ -747,7 +2464,7 @@ async def update_ticket_status(ticket_id: str, status: str, current_user: UserRe
         raise HTTPException(status_code=404, detail="Ticket no encontrado")
     
     # Get ticket to send notification to user
-    ticket = await db.support_tickets.find_one({"id": ticket_id})
+    ticket = await db.support_tickets.find_one({"id": ticket_id}, {"_id": 0, "subject": 1, "user_id": 1})
     if ticket:
         await create_notification(
             title="Actualización de Ticket de Soporte",
@@ -763,25 +2480,276 @@ async def update_ticket_status(ticket_id: str, status: str, current_user: UserRe
     return {"message": f"Estado del ticket actualizado a {status}"}
 
 @api_router.get("/admin/messages", response_model=List[Message])
-async def get_all_messages(current_user: UserResponse = Depends(get_admin_user)):
-    messages = await db.messages.find({}).sort("created_at", -1).to_list(100)
-    return [Message(**m) for m in messages]
+async def get_all_messages(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    messages = await paginate(reporting_db.messages, {}, model_projection(Message), limit, after, response)
+    return model_list_response(Message, messages, response)
 
 @api_router.get("/wallet-addresses")
-async def get_wallet_addresses():
-    return WALLET_ADDRESSES
+async def get_wallet_addresses(request: Request):
+    return cached_payload_response(request, static_payloads["wallet_addresses"], STATIC_CACHE_CONTROL)
+
+@api_router.get("/admin/metrics")
+async def get_admin_metrics(current_user: UserResponse = Depends(get_admin_user)):
+    completed = password_pool_stats["completed"]
+    return {
+        "password_pool": {
+            **password_pool_stats,
+            "workers": PASSWORD_HASH_WORKERS,
+            "max_queue": PASSWORD_HASH_MAX_QUEUE,
+            "wait_seconds_avg": password_pool_stats["wait_seconds_total"] / completed if completed else 0.0,
+            "compute_seconds_avg": password_pool_stats["compute_seconds_total"] / completed if completed else 0.0
+        },
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "revoked_tokens": len(revoked_tokens),
+        "mongo_pool": pool_metrics.stats(),
+        "shared_state": shared_state.stats(),
+        "rate_limits": {
+            **rate_limit_stats,
+            "enabled": RATE_LIMIT_ENABLED,
+            "budgets": {route_class: {"burst": capacity, "per_second": rate} for route_class, (capacity, rate) in RATE_LIMITS.items()}
+        },
+        "market_hub": market_hub.stats(),
+        "notification_hub": notification_hub.stats(),
+        "notification_outbox": {
+            **outbox_stats,
+            "queue_depth": notification_queue.qsize(),
+            "max_queue": NOTIFICATION_QUEUE_SIZE,
+            "flush_seconds_avg": outbox_stats["flush_seconds_total"] / outbox_stats["flushes"] if outbox_stats["flushes"] else 0.0
+        }
+    }
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Request instrumentation
+class RouteMetrics:
+    """Per-(method, route template) series, created on the first request and reused afterwards"""
+    
+    __slots__ = ("labels", "latency", "size", "statuses")
+    
+    def __init__(self, method: str, route: str):
+        self.labels = f'method="{method}",route="{route}"'
+        self.latency = Histogram(LATENCY_BUCKETS, self.labels)
+        self.size = Histogram(SIZE_BUCKETS, self.labels)
+        self.statuses = {}
+
+route_metrics = {}
+http_in_flight = {"requests": 0}
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request and counting response bytes and statuses per route"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started_at = time.perf_counter()
+        response = [500, 0]  # status, body bytes
+        
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                response[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                response[1] += len(message.get("body", b""))
+            await send(message)
+        
+        http_in_flight["requests"] += 1
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            http_in_flight["requests"] -= 1
+            # The router records the matched route in the scope; label by its template, never the raw path
+            route = scope.get("route")
+            method = scope["method"] if scope["method"] in METRIC_METHODS else "OTHER"
+            key = (method, route.path if route is not None else "unmatched")
+            metrics = route_metrics.get(key)
+            if metrics is None:
+                metrics = route_metrics[key] = RouteMetrics(*key)
+            metrics.latency.observe(time.perf_counter() - started_at)
+            metrics.size.observe(response[1])
+            metrics.statuses[response[0]] = metrics.statuses.get(response[0], 0) + 1
+
+def rate_limit_class(method: str, path: str) -> str:
+    route_class = RATE_LIMIT_ROUTES.get((method, path))
+    if route_class is not None:
+        return route_class
+    for prefix_method, prefix, prefix_class in RATE_LIMIT_PREFIXES:
+        if method == prefix_method and path.startswith(prefix):
+            return prefix_class
+    return "read"
+
+def client_address(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-forwarded-for":
+            if RATE_LIMIT_TRUST_FORWARDED_FOR:
+                return value.decode("latin-1").rsplit(",", 1)[-1].strip()
+            # Proxied but keyed by the proxy: every client behind it shares one set of buckets
+            if not rate_limit_stats["untrusted_forwarded"]:
+                logger.warning(
+                    "!!! Rate limiting a proxied request by the proxy address %s; "
+                    "set RATE_LIMIT_TRUST_FORWARDED_FOR=true behind a reverse proxy",
+                    scope["client"][0] if scope.get("client") else "unknown"
+                )
+            rate_limit_stats["untrusted_forwarded"] += 1
+            break
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def bearer_user_id(scope) -> Optional[str]:
+    """User id of a valid bearer token; served from the verified-token cache on repeat requests"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            try:
+                return verify_token(token)[0]
+            except HTTPException:
+                return None
+    return None
+
+class RateLimitMiddleware:
+    """Pure ASGI admission control: one bucket per client address, one per (route class, user or address)"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED or scope["method"] == "OPTIONS" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+        
+        route_class = rate_limit_class(scope["method"], scope["path"])
+        address = client_address(scope)
+        # Auth routes are limited per address: there is no user yet, and a stolen token must not buy more attempts
+        identity = address if route_class == "auth" else bearer_user_id(scope) or address
+        try:
+            retry_after = await shared_state.take_token(f"ip:{address}", *RATE_LIMITS["ip"])
+            limited_class = "ip"
+            if not retry_after:
+                retry_after = await shared_state.take_token(f"{route_class}:{identity}", *RATE_LIMITS[route_class])
+                limited_class = route_class
+        except Exception:
+            # Fail open: losing the shared backend must not take the API down with it
+            rate_limit_stats["backend_errors"] += 1
+            logger.exception("Rate limiter backend failed; admitting the request")
+            retry_after = 0
+        
+        if retry_after:
+            rate_limit_stats["rejected"][limited_class] += 1
+            response = ORJSONResponse(
+                status_code=429,
+                content={"detail": "Demasiadas solicitudes, inténtalo de nuevo más tarde"},
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+def render_metrics() -> str:
+    lines = [
+        "# HELP http_requests_in_flight HTTP requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {http_in_flight['requests']}",
+        "# HELP http_request_duration_seconds Time to serve an HTTP request, by route template.",
+        "# TYPE http_request_duration_seconds histogram"
+    ]
+    for metrics in list(route_metrics.values()):
+        lines.extend(metrics.latency.render("http_request_duration_seconds"))
+    lines += [
+        "# HELP http_response_size_bytes Response body size, by route template.",
+        "# TYPE http_response_size_bytes histogram"
+    ]
+    for metrics in list(route_metrics.values()):
+        lines.extend(metrics.size.render("http_response_size_bytes"))
+    lines += [
+        "# HELP http_responses_total Responses sent, by route template and status code.",
+        "# TYPE http_responses_total counter"
+    ]
+    for metrics in list(route_metrics.values()):
+        for status_code, count in list(metrics.statuses.items()):
+            lines.append(f'http_responses_total{{{metrics.labels},status="{status_code}"}} {count}')
+    
+    lines += [
+        "# HELP mongo_command_duration_seconds MongoDB command round trip, by collection and command.",
+        "# TYPE mongo_command_duration_seconds histogram"
+    ]
+    with command_metrics._lock:
+        for histogram in command_metrics.durations.values():
+            lines.extend(histogram.render("mongo_command_duration_seconds"))
+        lines += [
+            "# HELP mongo_command_failures_total MongoDB commands that failed, by collection and command.",
+            "# TYPE mongo_command_failures_total counter"
+        ]
+        for key, count in command_metrics.failures.items():
+            lines.append(f'mongo_command_failures_total{{collection="{key[0]}",command="{key[1]}"}} {count}')
+    
+    pool = pool_metrics.stats()
+    lines += [
+        "# HELP mongo_pool_connections Pooled MongoDB connections, by state.",
+        "# TYPE mongo_pool_connections gauge",
+        f'mongo_pool_connections{{state="open"}} {pool["open"]}',
+        f'mongo_pool_connections{{state="checked_out"}} {pool["checked_out"]}',
+        "# HELP mongo_pool_checkout_timeouts_total Checkouts that gave up after MONGO_WAIT_QUEUE_TIMEOUT_MS.",
+        "# TYPE mongo_pool_checkout_timeouts_total counter",
+        f"mongo_pool_checkout_timeouts_total {pool['checkout_timeouts']}",
+        "# HELP password_hash_duration_seconds bcrypt operations on the password pool, by stage.",
+        "# TYPE password_hash_duration_seconds histogram"
+    ]
+    for histogram in password_histograms.values():
+        lines.extend(histogram.render("password_hash_duration_seconds"))
+    lines += [
+        "# HELP password_hash_in_flight bcrypt operations queued or running.",
+        "# TYPE password_hash_in_flight gauge",
+        f"password_hash_in_flight {password_pool_stats['in_flight']}",
+        "# HELP rate_limited_requests_total Requests rejected with 429, by the budget that ran out.",
+        "# TYPE rate_limited_requests_total counter"
+    ]
+    for route_class, count in rate_limit_stats["rejected"].items():
+        lines.append(f'rate_limited_requests_total{{budget="{route_class}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.exception_handler(WaitQueueTimeoutError)
+async def mongo_pool_exhausted(request: Request, exc: WaitQueueTimeoutError):
+    # Every pooled connection stayed busy for MONGO_WAIT_QUEUE_TIMEOUT_MS: shed load instead of queueing further
+    logger.warning("MongoDB connection pool exhausted on %s %s", request.method, request.url.path)
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": "Servicio saturado, inténtalo de nuevo en unos segundos"},
+        headers={"Retry-After": "1"}
+    )
+
+# Inside CORS, so browsers can read the 429 responses
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# Outermost, so the time spent in the other middleware is measured too
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -789,6 +2757,137 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def report_index_build_progress(collection: str, index_name: str):
+    """Periodically log the server-side progress of an in-flight index build"""
+    while True:
+        await asyncio.sleep(INDEX_PROGRESS_INTERVAL_SECONDS)
+        try:
+            current = await client.admin.command({"currentOp": True, "command.createIndexes": collection})
+        except OperationFailure:
+            logger.info("Index %s on %s still building...", index_name, collection)
+            continue
+        for operation in current.get("inprog", []):
+            progress = operation.get("progress") or {}
+            if progress.get("total"):
+                logger.info(
+                    "Index %s on %s: %s (%d/%d)",
+                    index_name, collection, operation.get("msg", "building"), progress["done"], progress["total"]
+                )
+
+@app.on_event("startup")
+async def start_shared_state():
+    await shared_state.start(dispatch_shared_message)
+    snapshot = await shared_state.get("market:snapshot")
+    if snapshot is not None:
+        apply_market_snapshot(snapshot)
+    logger.info("Shared state: %s (worker %s)", shared_state.name, WORKER_ID)
+
+async def run_user_search_backfill():
+    """Set the lowercased search fields on users created before the admin search, once across all workers"""
+    while True:
+        try:
+            if await backfill_user_search_fields():
+                return
+        except Exception:
+            logger.exception("User search backfill failed")
+        # Another worker leads it; take over from its checkpoint if that worker stops before finishing
+        await asyncio.sleep(USER_BACKFILL_LEADER_TTL_SECONDS)
+
+async def backfill_user_search_fields() -> bool:
+    """Backfill while this worker leads the "user_backfill" role; True once the migration is complete"""
+    migration = await db.migrations.find_one({"_id": USER_BACKFILL_MIGRATION_ID})
+    if migration is not None and migration.get("completed_at"):
+        return True
+    
+    # Walks _id from the last checkpoint, so every user is read once even across restarts
+    last_id = migration.get("last_id") if migration else None
+    updated = 0
+    while await shared_state.acquire_leadership("user_backfill", USER_BACKFILL_LEADER_TTL_SECONDS):
+        query = {"email_lower": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        users = await db.users.find(query, {"_id": 1, "email": 1, "name": 1}).sort("_id", ASCENDING).limit(
+            USER_BACKFILL_BATCH_SIZE
+        ).to_list(USER_BACKFILL_BATCH_SIZE)
+        if not users:
+            await db.migrations.update_one(
+                {"_id": USER_BACKFILL_MIGRATION_ID}, {"$set": {"completed_at": datetime.utcnow()}}, upsert=True
+            )
+            logger.info("Backfilled search fields on %d users", updated)
+            return True
+        
+        await db.users.bulk_write([
+            UpdateOne({"_id": user["_id"]}, {"$set": {"email_lower": user["email"].lower(), "name_lower": user["name"].lower()}})
+            for user in users
+        ], ordered=False)
+        updated += len(users)
+        last_id = users[-1]["_id"]
+        await db.migrations.update_one({"_id": USER_BACKFILL_MIGRATION_ID}, {"$set": {"last_id": last_id}}, upsert=True)
+    return False
+
+@app.on_event("startup")
+async def ensure_indexes():
+    failed = set()
+    for position, (collection, keys, options) in enumerate(REQUIRED_INDEXES, start=1):
+        logger.info("Ensuring index %s on %s (%d/%d)", options["name"], collection, position, len(REQUIRED_INDEXES))
+        started_at = time.perf_counter()
+        progress_task = asyncio.create_task(report_index_build_progress(collection, options["name"]))
+        try:
+            await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            logger.error("Could not build index %s on %s: %s", options["name"], collection, e)
+            failed.add(options["name"])
+            continue
+        finally:
+            progress_task.cancel()
+        logger.info("Index %s ready in %.2fs", options["name"], time.perf_counter() - started_at)
+    
+    # An index with the same keys under another name also satisfies the query pattern
+    missing = []
+    for collection, keys, options in REQUIRED_INDEXES:
+        existing = await db[collection].index_information()
+        if options["name"] not in existing and not any(info["key"] == keys for info in existing.values()):
+            missing.append(f"{collection}.{options['name']}" + (" (build failed)" if options["name"] in failed else ""))
+    
+    if missing:
+        if REQUIRE_INDEXES:
+            raise RuntimeError(f"Required indexes are missing: {', '.join(missing)}")
+        logger.warning("!!! Serving WITHOUT required indexes, queries will scan collections: %s", ", ".join(missing))
+
+@app.on_event("startup")
+async def ensure_platform_stats():
+    while await db.platform_stats.count_documents({"_id": PLATFORM_STATS_ID}, limit=1) == 0:
+        logger.info("Building platform stats document")
+        if await reconcile_platform_stats_exclusively() is None:
+            await asyncio.sleep(1)  # another worker is building it
+
+@app.on_event("startup")
+async def load_notification_counters():
+    # One starting worker recounts and publishes the result; the others take the shared value meanwhile
+    if await shared_state.claim("notifications:recount", STATS_RECONCILE_LEASE_SECONDS):
+        await reconcile_unread_notifications()
+    else:
+        notification_counters["unread"] = int(await shared_state.get("notifications:unread") or 0)
+
+@app.on_event("startup")
+async def load_revoked_tokens():
+    await sync_revoked_tokens()
+    logger.info("Loaded %d revoked tokens", len(revoked_tokens))
+
+@app.on_event("startup")
+async def start_background_tasks():
+    background_tasks.append(asyncio.create_task(run_trading_ticker()))
+    background_tasks.append(asyncio.create_task(run_notification_writer()))
+    background_tasks.append(asyncio.create_task(run_stats_reconciler()))
+    background_tasks.append(asyncio.create_task(run_revocation_sync()))
+    background_tasks.append(asyncio.create_task(run_user_search_backfill()))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await drain_notification_outbox()
+    await shared_state.close()
+    client.close()
+    password_executor.shutdown(wait=False)
\ No newline at end of file
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the per-request authentication cost in get_current_user.
+
+Compares full HS256 verification on every call against the verified-token cache.
+The authenticated user is served from the user cache in both cases, so only the
+JWT path is measured and no MongoDB server is needed.
+
+    python benchmarks/auth_benchmark.py [iterations]
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+def benchmark(label, token, iterations):
+    async def run():
+        for _ in range(iterations):
+            await server.authenticate_token(token)
+
+    started_at = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started_at
+    print(f"{label:<28} {elapsed / iterations * 1e6:8.2f} µs/request  ({iterations / elapsed:,.0f} req/s)")
+    return elapsed / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    user = server.UserResponse(
+        id="benchmark-user",
+        name="Benchmark",
+        email="benchmark@bitsecure.com",
+        balance=0.0,
+        is_admin=False,
+        created_at=server.datetime.utcnow()
+    )
+    server.user_cache = server.TTLCache(10, 3600)
+    server.user_cache.set(user.id, user)
+    token = server.create_access_token(data={"sub": user.id})
+
+    print(f"Authenticating the same token {iterations:,} times")
+    server.token_cache = server.TTLCache(0, 0)
+    uncached = benchmark("full JWT verification", token, iterations)
+    server.token_cache = server.TTLCache(server.TOKEN_CACHE_MAX_ENTRIES, server.TOKEN_CACHE_TTL_SECONDS)
+    cached = benchmark("verified-token cache", token, iterations)
+    print(f"Speed-up: {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
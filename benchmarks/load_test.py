@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+In-process load test of the API.
+
+The FastAPI app is driven through httpx's ASGI transport, so nothing listens on a
+port and no remote environment is involved. It runs against a local MongoDB
+(--mongo-url, in a throwaway database) or an in-memory mongomock stand-in (--mock).
+
+Scenarios:
+    login_storm            concurrent logins of already registered users (bcrypt pool)
+    dashboard_fanout       the requests the dashboard fires on load, for many users at once
+    admin_listing          admin transaction listing paged through the keyset cursor over a large collection
+    withdrawal_contention  parallel withdrawals racing for one balance, which must never go negative
+
+Each scenario reports successful req/s, p50/p95/p99 latency of the successful (2xx)
+responses and MongoDB operations per request; rejections are only counted by status.
+Results can be saved as a baseline and later runs compared against it:
+
+    python benchmarks/load_test.py --mock --save-baseline benchmarks/baselines/mongomock.json
+    python benchmarks/load_test.py --mock --baseline benchmarks/baselines/mongomock.json
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017 --transactions 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCENARIOS = ["login_storm", "dashboard_fanout", "admin_listing", "withdrawal_contention"]
+LOADTEST_DB_NAME = "bitsecure_loadtest"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mongo-url", help="local MongoDB to run against (uses and drops a throwaway database)")
+    target.add_argument("--mock", action="store_true", help="run against an in-memory mongomock stand-in")
+    parser.add_argument("--db-name", default=LOADTEST_DB_NAME, help=f"database for --mongo-url (default {LOADTEST_DB_NAME})")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="scenario to run (repeatable, default all)")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight at once (default 50)")
+    parser.add_argument("--users", type=int, default=20, help="registered users for login and dashboard (default 20)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario (default 200)")
+    parser.add_argument("--transactions", type=int, help="transactions seeded for admin_listing (default 1000000, 2000 with --mock)")
+    parser.add_argument("--pages", type=int, default=5, help="pages followed per admin listing (default 5)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the results against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative slowdown reported as a regression (default 0.25)")
+    args = parser.parse_args()
+    if args.transactions is None:
+        args.transactions = 2000 if args.mock else 1000000
+    if args.mongo_url and args.db_name == os.environ.get("DB_NAME", "bitsecure"):
+        parser.error("refusing to run against the application database; pick another --db-name")
+    return args
+
+
+class MockOpCounter:
+    """Counts mongomock collection calls; nested calls (find_one -> find) count once"""
+
+    METHODS = [
+        "find", "find_one", "find_one_and_update", "insert_one", "insert_many", "update_one", "update_many",
+        "replace_one", "delete_one", "delete_many", "count_documents", "estimated_document_count",
+        "aggregate", "bulk_write", "create_index", "index_information"
+    ]
+
+    def __init__(self):
+        import mongomock.collection
+
+        self.count = 0
+        self._local = threading.local()
+        for name in self.METHODS:
+            setattr(mongomock.collection.Collection, name, self._counted(getattr(mongomock.collection.Collection, name)))
+
+    def _counted(self, method):
+        counter = self
+
+        def wrapper(*args, **kwargs):
+            depth = getattr(counter._local, "depth", 0)
+            if depth == 0:
+                counter.count += 1
+            counter._local.depth = depth + 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                counter._local.depth = depth
+        return wrapper
+
+    def total(self) -> int:
+        return self.count
+
+
+class CommandOpCounter:
+    """Counts commands seen by the server's own CommandListener (real MongoDB only)"""
+
+    def __init__(self, server):
+        self.metrics = server.command_metrics
+
+    def total(self) -> int:
+        with self.metrics._lock:
+            return sum(sum(histogram.counts) for histogram in self.metrics.durations.values())
+
+
+def load_server(args):
+    # Configure before import: the client, pool and database are created at import time
+    os.environ["MONGO_URL"] = args.mongo_url or os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = args.db_name
+    # Every simulated client shares one address; the scenarios measure the app, not the admission control
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+    import server
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+
+        server.client = AsyncMongoMockClient()
+        server.db = server.reporting_db = server.client.get_database(args.db_name)
+        return server, MockOpCounter()
+    return server, CommandOpCounter(server)
+
+
+class ScenarioResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.statuses = Counter()
+        self.elapsed = 0.0
+        self.mongo_ops = 0
+        self.notes = []
+
+    def summary(self) -> dict:
+        # Rejections (429s, failed withdrawals) return early and would flatter every latency figure
+        latencies = sorted(self.latencies)
+        count = sum(self.statuses.values())
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+
+        return {
+            "requests": count,
+            "statuses": {str(code): seen for code, seen in sorted(self.statuses.items())},
+            "req_per_s": len(latencies) / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "mongo_ops_per_request": self.mongo_ops / count if count else 0.0
+        }
+
+
+async def request(client, result: ScenarioResult, method: str, url: str, **kwargs):
+    started_at = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    if response.is_success:
+        result.latencies.append(time.perf_counter() - started_at)
+    result.statuses[response.status_code] += 1
+    return response
+
+
+async def run_concurrently(jobs, concurrency: int):
+    """Await the job factories with at most `concurrency` of them in flight"""
+    pending = iter(jobs)
+
+    async def worker():
+        for job in pending:
+            await job()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def measure(name: str, counter, run) -> ScenarioResult:
+    result = ScenarioResult(name)
+    ops_before = counter.total()
+    started_at = time.perf_counter()
+    await run(result)
+    result.elapsed = time.perf_counter() - started_at
+    result.mongo_ops = counter.total() - ops_before
+    return result
+
+
+async def register(client, name: str) -> dict:
+    response = await client.post("/auth/register", json={
+        "name": name,
+        "email": f"{name.lower().replace(' ', '_')}_{uuid.uuid4().hex[:8]}@loadtest.bitsecure.com",
+        "password": "LoadTest123!"
+    })
+    response.raise_for_status()
+    return response.json()
+
+
+async def prepare(client, server, args) -> dict:
+    """Register the admin and the users, and seed what the scenarios read"""
+    admin = await register(client, "Load Admin")
+    if not admin["user"]["is_admin"]:
+        raise SystemExit("The first registered user must be the admin: start from an empty database")
+
+    users = []
+
+    async def register_user(position):
+        users.append(await register(client, f"Load User {position}"))
+    await run_concurrently([lambda position=position: register_user(position) for position in range(args.users)], args.concurrency)
+
+    # A few documents per user so the dashboard lists are not empty
+    now = datetime.utcnow()
+    for user in users:
+        user_id = user["user"]["id"]
+        await server.db.transactions.insert_many([
+            server.Transaction(user_id=user_id, type="deposit", method="Crypto (BTC)", amount=10.0 + i,
+                               details="loadtest", status="completed", created_at=now - timedelta(minutes=i)).dict()
+            for i in range(20)
+        ])
+        await server.db.messages.insert_many([
+            server.Message(to_user_id=user_id, subject="Load", content="test", created_at=now - timedelta(minutes=i)).dict()
+            for i in range(5)
+        ])
+
+    return {
+        "admin_headers": {"Authorization": f"Bearer {admin['access_token']}"},
+        "users": users
+    }
+
+
+async def seed_transactions(server, count: int, batch_size: int = 10000):
+    """Bulk-load the listing data before the startup index build, the way a restore would"""
+    started_at = time.perf_counter()
+    user_ids = [str(uuid.uuid4()) for _ in range(1000)]
+    base = datetime.utcnow() - timedelta(days=90)
+    statuses = ["completed", "completed", "completed", "pending", "failed"]
+    for start in range(0, count, batch_size):
+        await server.db.transactions.insert_many([
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": user_ids[position % len(user_ids)],
+                "type": "deposit" if position % 3 else "withdrawal",
+                "method": "Crypto (BTC)" if position % 3 else "Paypal",
+                "amount": float(10 + position % 990),
+                "details": "loadtest",
+                "status": statuses[position % len(statuses)],
+                "created_at": base + timedelta(seconds=position * 7)
+            }
+            for position in range(start, min(count, start + batch_size))
+        ], ordered=False)
+    elapsed = time.perf_counter() - started_at
+    print(f"Seeded {count:,} transactions in {elapsed:.1f}s ({count / elapsed:,.0f} docs/s)")
+
+
+async def login_storm(client, server, context, args) -> ScenarioResult:
+    emails = [user["user"]["email"] for user in context["users"]]
+    # Past the password pool's capacity logins are rejected with 429, which measures admission, not bcrypt
+    concurrency = min(args.concurrency, password_pool_capacity(server))
+
+    async def run(result):
+        await run_concurrently([
+            lambda i=i: request(client, result, "POST", "/auth/login", json={"email": emails[i % len(emails)], "password": "LoadTest123!"})
+            for i in range(args.requests)
+        ], concurrency)
+    result = await measure("login_storm", context["counter"], run)
+    if concurrency < args.concurrency:
+        result.notes.append(f"concurrency capped at {concurrency} (PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE)")
+    return result
+
+
+DASHBOARD_REQUESTS = [
+    ("GET", "/auth/me", True),
+    ("GET", "/transactions", True),
+    ("GET", "/messages", True),
+    ("GET", "/support/tickets", True),
+    ("GET", "/trading/data", False),
+    ("GET", "/crypto/prices", False),
+    ("GET", "/crypto/news", False)
+]
+
+
+async def dashboard_fanout(client, server, context, args) -> ScenarioResult:
+    users = context["users"]
+    loads = max(1, args.requests // len(DASHBOARD_REQUESTS))
+
+    async def load_dashboard(result, user):
+        headers = {"Authorization": f"Bearer {user['access_token']}"}
+        await asyncio.gather(*(
+            request(client, result, method, url, headers=headers if authenticated else {})
+            for method, url, authenticated in DASHBOARD_REQUESTS
+        ))
+
+    async def run(result):
+        await run_concurrently([
+            lambda i=i: load_dashboard(result, users[i % len(users)]) for i in range(loads)
+        ], max(1, args.concurrency // len(DASHBOARD_REQUESTS)))
+    return await measure("dashboard_fanout", context["counter"], run)
+
+
+async def admin_listing(client, server, context, args) -> ScenarioResult:
+    listings = max(1, args.requests // args.pages)
+
+    async def list_pages(result):
+        after = None
+        for _ in range(args.pages):
+            params = {"limit": 50, **({"after": after} if after else {})}
+            response = await request(client, result, "GET", "/admin/transactions", params=params, headers=context["admin_headers"])
+            after = response.headers.get(server.NEXT_CURSOR_HEADER)
+            if not after:
+                break
+
+    async def run(result):
+        await run_concurrently([lambda: list_pages(result) for _ in range(listings)], args.concurrency)
+    return await measure("admin_listing", context["counter"], run)
+
+
+async def withdrawal_contention(client, server, context, args) -> ScenarioResult:
+    user = await register(client, "Contention User")
+    user_headers = {"Authorization": f"Bearer {user['access_token']}"}
+    amount = 10.0
+    # Enough balance for a third of the attempts
+    initial_balance = amount * (args.requests // 3)
+    response = await client.put(
+        f"/admin/users/{user['user']['id']}/balance",
+        params={"new_balance": initial_balance},
+        headers=context["admin_headers"]
+    )
+    response.raise_for_status()
+
+    async def run(result):
+        await run_concurrently([
+            lambda: request(client, result, "POST", "/withdrawals", headers=user_headers,
+                            json={"method": "bizum", "amount": amount, "details": {"phone": "600000000"}})
+            for _ in range(args.requests)
+        ], args.concurrency)
+    result = await measure("withdrawal_contention", context["counter"], run)
+
+    final_balance = (await client.get("/auth/me", headers=user_headers)).json()["balance"]
+    succeeded = result.statuses[200]
+    consistent = final_balance >= 0 and final_balance == initial_balance - succeeded * amount
+    result.notes.append(
+        f"{succeeded} withdrawals succeeded, balance {initial_balance} -> {final_balance} "
+        f"({'consistent' if consistent else 'INCONSISTENT'})"
+    )
+    return result
+
+
+SCENARIO_FUNCTIONS = {
+    "login_storm": login_storm,
+    "dashboard_fanout": dashboard_fanout,
+    "admin_listing": admin_listing,
+    "withdrawal_contention": withdrawal_contention
+}
+
+
+def print_result(summary: dict, name: str, notes):
+    statuses = ", ".join(f"{code}: {seen}" for code, seen in summary["statuses"].items())
+    print(f"{name:<24} {summary['requests']:>6} req  {summary['req_per_s']:>8.1f} req/s  "
+          f"p50 {summary['p50_ms']:>7.2f} ms  p95 {summary['p95_ms']:>7.2f} ms  p99 {summary['p99_ms']:>7.2f} ms  "
+          f"{summary['mongo_ops_per_request']:>5.2f} mongo ops/req  [{statuses}]")
+    for note in notes:
+        print(f"{'':<24} {note}")
+
+
+def password_pool_capacity(server) -> int:
+    return server.PASSWORD_HASH_WORKERS + server.PASSWORD_HASH_MAX_QUEUE
+
+
+def run_parameters(args, server) -> dict:
+    return {
+        "target": "mongomock" if args.mock else "mongodb",
+        "concurrency": args.concurrency,
+        "password_pool_capacity": password_pool_capacity(server),
+        "users": args.users,
+        "requests": args.requests,
+        "transactions": args.transactions,
+        "pages": args.pages
+    }
+
+
+def compare(results: dict, baseline: dict, parameters: dict, tolerance: float) -> bool:
+    """Print the change against the baseline; return True when any scenario regressed"""
+    print(f"\nCompared with the baseline recorded {baseline['recorded_at']} on Python {baseline['python']}:")
+    if baseline["parameters"] != parameters:
+        print(f"  WARNING: the baseline used different parameters: {baseline['parameters']}")
+    regressed = False
+    for name, summary in results.items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            print(f"  {name}: not in the baseline")
+            continue
+        changes = []
+        for metric, higher_is_worse in [("req_per_s", False), ("p95_ms", True), ("p99_ms", True), ("mongo_ops_per_request", True)]:
+            if not previous[metric]:
+                continue
+            change = summary[metric] / previous[metric] - 1
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            regressed |= worse
+            changes.append(f"{metric} {previous[metric]:.2f} -> {summary[metric]:.2f} ({change:+.0%}){' REGRESSION' if worse else ''}")
+        print(f"  {name}: " + "; ".join(changes))
+    return regressed
+
+
+async def main(args):
+    server, counter = load_server(args)
+    if args.mongo_url:
+        await server.client.drop_database(args.db_name)
+    if "admin_listing" in args.scenarios:
+        await seed_transactions(server, args.transactions)
+
+    for handler in server.app.router.on_startup:
+        await handler()
+
+    import httpx
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest/api", timeout=None) as client:
+        print(f"Preparing {args.users} users on {'mongomock' if args.mock else args.mongo_url + '/' + args.db_name}")
+        context = await prepare(client, server, args)
+        context["counter"] = counter
+
+        results = {}
+        for name in args.scenarios:
+            result = await SCENARIO_FUNCTIONS[name](client, server, context, args)
+            results[name] = result.summary()
+            print_result(results[name], name, result.notes)
+
+    for handler in server.app.router.on_shutdown:
+        await handler()
+    if args.mongo_url:
+        drop_client = server.AsyncIOMotorClient(args.mongo_url)
+        await drop_client.drop_database(args.db_name)
+        drop_client.close()
+    return results
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.scenarios = args.scenario or SCENARIOS
+    results = asyncio.run(main(args))
+
+    parameters = run_parameters(args, sys.modules["server"])
+    regressed = False
+    if args.baseline:
+        regressed = compare(results, json.loads(Path(args.baseline).read_text()), parameters, args.tolerance)
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps({
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "parameters": parameters,
+            "scenarios": results
+        }, indent=2) + "\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+    sys.exit(1 if regressed else 0)
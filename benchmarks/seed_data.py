@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for users, transactions, notifications, messages and support tickets.
+
+Documents follow the Pydantic models in backend/server.py. Transactions,
+notifications, messages and tickets are spread over users with a power-law skew,
+so a few heavy users own most of the history. Timestamps span --months, up to --end.
+
+Every chunk of documents is derived only from (--seed, collection, chunk number).
+The same arguments therefore always produce the same dataset, however many --workers
+generate and insert it in parallel.
+
+    python benchmarks/seed_data.py --db-name bitsecure_bench --users 100000 --transactions 10000000 --drop
+
+Seed before starting the app: indexes are built (with progress logging) on startup,
+and the platform stats document is rebuilt from the new data. Every seeded user can
+log in as user<N>@seed.bitsecure.com with the password SeedPass123!; user0 is the admin.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+COLLECTIONS = ["users", "transactions", "notifications", "messages", "support_tickets"]
+SUPPORTED_CRYPTOS = ["BTC", "ETH", "USDT", "BNB", "ADA"]
+WALLET_ADDRESS = "bc1qflt3sxs06c6jnj25hj85py5tjjl4gnsraph9ky"
+SEED_PASSWORD = "SeedPass123!"
+SEED_NAMESPACE = uuid.UUID("6f1c3a52-4a8e-4d5b-9a63-2f0b8c1d7e90")
+# Multiplier spreading heavy users over the whole id range instead of the oldest accounts
+SPREAD_PRIME = 1000003
+
+FIRST_NAMES = ["Lucía", "Hugo", "Martina", "Mateo", "Sofía", "Leo", "Julia", "Daniel", "Paula", "Álvaro",
+               "Valeria", "Pablo", "Emma", "Manuel", "Carla", "Adrián", "Sara", "David", "Noa", "Mario"]
+LAST_NAMES = ["García", "Rodríguez", "González", "Fernández", "López", "Martínez", "Sánchez", "Pérez",
+              "Gómez", "Martín", "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Muñoz", "Álvarez", "Romero"]
+
+TRANSACTION_STATUSES = (["completed", "pending", "failed"], [80, 12, 8])
+TICKET_PRIORITIES = (["low", "medium", "high"], [30, 55, 15])
+TICKET_STATUSES = (["open", "in_progress", "resolved", "closed"], [15, 10, 30, 45])
+NOTIFICATION_TYPES = (
+    ["deposit", "withdrawal", "user_registration", "deposit_approved", "deposit_rejected",
+     "balance_update", "admin_message", "support_ticket", "support_update"],
+    [30, 12, 8, 25, 5, 5, 5, 5, 5]
+)
+
+
+class SeedPlan:
+    """Everything about the dataset that has to agree across chunks and worker processes"""
+
+    def __init__(self, seed: int, users: int, months: int, end: datetime, skew: float, password_hash: str):
+        self.seed = seed
+        self.users = users
+        self.end = end
+        self.start = end - timedelta(days=30 * months)
+        self.skew = skew
+        self.password_hash = password_hash
+        self.spread = SPREAD_PRIME if users % SPREAD_PRIME else 1
+
+    def rng(self, collection: str, chunk: int) -> random.Random:
+        return random.Random(f"{self.seed}:{collection}:{chunk}")
+
+    def user_id(self, index: int) -> str:
+        return str(uuid.uuid5(SEED_NAMESPACE, f"{self.seed}:user:{index}"))
+
+    def user_name(self, index: int) -> str:
+        return f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[index // len(FIRST_NAMES) % len(LAST_NAMES)]}"
+
+    def user_email(self, index: int) -> str:
+        return f"user{index}@seed.bitsecure.com"
+
+    def user_created_at(self, index: int) -> datetime:
+        # Steady sign-ups over the whole span
+        return self.start + (self.end - self.start) * (index / self.users)
+
+    def pick_user(self, rng: random.Random) -> int:
+        """Power-law pick: with skew s the busiest 1% of users own roughly 0.01^(1/s) of the documents"""
+        rank = int(self.users * rng.random() ** self.skew)
+        return rank * self.spread % self.users
+
+    def moment_after(self, rng: random.Random, earliest: datetime) -> datetime:
+        moment = earliest + (self.end - earliest) * rng.random()
+        return moment.replace(microsecond=moment.microsecond // 1000 * 1000)
+
+
+def amount(rng: random.Random) -> float:
+    return round(max(10.0, rng.lognormvariate(4.5, 1.1)), 2)
+
+
+def user_document(plan: SeedPlan, rng: random.Random, index: int) -> dict:
+    return {
+        "id": plan.user_id(index),
+        "name": plan.user_name(index),
+        "email": plan.user_email(index),
+        "password_hash": plan.password_hash,
+        "balance": round(rng.lognormvariate(5, 1.5), 2) if rng.random() < 0.7 else 0.0,
+        "crypto_balances": {
+            crypto: round(rng.lognormvariate(4, 1.5), 2) if rng.random() < 0.25 else 0.0
+            for crypto in SUPPORTED_CRYPTOS
+        },
+        "is_admin": index == 0,
+        "created_at": plan.user_created_at(index),
+        "email_lower": plan.user_email(index).lower(),
+        "name_lower": plan.user_name(index).lower()
+    }
+
+
+def transaction_document(plan: SeedPlan, rng: random.Random) -> dict:
+    user = plan.pick_user(rng)
+    if rng.random() < 0.65:
+        transaction_type = "deposit"
+        if rng.random() < 0.8:
+            method, details = f"Crypto ({rng.choice(SUPPORTED_CRYPTOS)})", f"Enviado a: {WALLET_ADDRESS}"
+        else:
+            method, details = "CryptoVoucher", f"Código: {rng.getrandbits(48):012X}"
+    else:
+        transaction_type = "withdrawal"
+        method = rng.choice(["Paypal", "Bank", "Bizum"])
+        details = {
+            "Paypal": f"PayPal: {plan.user_email(user)}",
+            "Bank": f"Banco: Banco Seed - IBAN: ES{rng.getrandbits(64):020d}",
+            "Bizum": f"Bizum: 6{rng.randrange(10 ** 8):08d}"
+        }[method]
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "user_id": plan.user_id(user),
+        "type": transaction_type,
+        "method": method,
+        "amount": amount(rng),
+        "details": details,
+        "status": rng.choices(*TRANSACTION_STATUSES)[0],
+        "created_at": plan.moment_after(rng, plan.user_created_at(user))
+    }
+
+
+def notification_document(plan: SeedPlan, rng: random.Random) -> dict:
+    user = plan.pick_user(rng)
+    notification_type = rng.choices(*NOTIFICATION_TYPES)[0]
+    value = amount(rng)
+    created_at = plan.moment_after(rng, plan.user_created_at(user))
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "title": notification_type.replace("_", " ").capitalize(),
+        "message": f"{plan.user_name(user)}: {notification_type} de €{value}",
+        "type": notification_type,
+        "user_id": plan.user_id(user),
+        "data": {"amount": value},
+        # Older notifications have almost all been read
+        "read": rng.random() < (0.95 if plan.end - created_at > timedelta(days=7) else 0.3),
+        "created_at": created_at
+    }
+
+
+def message_document(plan: SeedPlan, rng: random.Random) -> dict:
+    user = plan.pick_user(rng)
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "from_admin": True,
+        "to_user_id": plan.user_id(user),
+        "subject": rng.choice(["Verificación de cuenta", "Depósito recibido", "Actualización de seguridad", "Promoción"]),
+        "content": f"Hola {plan.user_name(user)}, este es un mensaje generado para pruebas de carga.",
+        "read": rng.random() < 0.7,
+        "created_at": plan.moment_after(rng, plan.user_created_at(user))
+    }
+
+
+def support_ticket_document(plan: SeedPlan, rng: random.Random) -> dict:
+    user = plan.pick_user(rng)
+    created_at = plan.moment_after(rng, plan.user_created_at(user))
+    status = rng.choices(*TICKET_STATUSES)[0]
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "user_id": plan.user_id(user),
+        "user_name": plan.user_name(user),
+        "user_email": plan.user_email(user),
+        "subject": rng.choice(["No veo mi depósito", "Retiro pendiente", "Cambiar email", "Error al iniciar sesión"]),
+        "message": "Ticket generado para pruebas de carga.",
+        "priority": rng.choices(*TICKET_PRIORITIES)[0],
+        "status": status,
+        "created_at": created_at,
+        "updated_at": None if status == "open" else plan.moment_after(rng, created_at)
+    }
+
+
+DOCUMENT_FACTORIES = {
+    "transactions": transaction_document,
+    "notifications": notification_document,
+    "messages": message_document,
+    "support_tickets": support_ticket_document
+}
+
+
+def generate_chunk(plan: SeedPlan, collection: str, chunk: int, chunk_size: int, total: int) -> list:
+    """Documents [chunk * chunk_size, ...) of a collection; a pure function of the plan and its arguments"""
+    rng = plan.rng(collection, chunk)
+    first = chunk * chunk_size
+    last = min(total, first + chunk_size)
+    if collection == "users":
+        return [user_document(plan, rng, index) for index in range(first, last)]
+    factory = DOCUMENT_FACTORIES[collection]
+    return [factory(plan, rng) for _ in range(first, last)]
+
+
+worker_database = None
+
+
+def init_worker(mongo_url: str, db_name: str):
+    global worker_database
+    from pymongo import MongoClient
+
+    worker_database = MongoClient(mongo_url)[db_name]
+
+
+def insert_chunk(plan: SeedPlan, collection: str, chunk: int, chunk_size: int, total: int, batch_size: int) -> int:
+    documents = generate_chunk(plan, collection, chunk, chunk_size, total)
+    for start in range(0, len(documents), batch_size):
+        worker_database[collection].insert_many(documents[start:start + batch_size], ordered=False)
+    return len(documents)
+
+
+def validate_samples(plan: SeedPlan):
+    """Run one chunk of every collection through the application's models before writing anything"""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+    import server
+
+    models = {
+        "users": server.User,
+        "transactions": server.Transaction,
+        "notifications": server.Notification,
+        "messages": server.Message,
+        "support_tickets": server.SupportTicket
+    }
+    for collection, model in models.items():
+        for document in generate_chunk(plan, collection, 0, 100, 100):
+            model(**document)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", required=True, help="database to fill")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--notifications", type=int, help="default: a tenth of --transactions")
+    parser.add_argument("--messages", type=int, help="default: as many as --users")
+    parser.add_argument("--support-tickets", type=int, help="default: a tenth of --users")
+    parser.add_argument("--months", type=int, default=12, help="history span (default 12)")
+    parser.add_argument("--end", type=datetime.fromisoformat,
+                        default=datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0),
+                        help="newest timestamp, ISO format (default: today 00:00 UTC; pin it to reproduce a dataset exactly)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=3.0, help="power-law exponent for documents per user; 1 is uniform (default 3)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--chunk-size", type=int, default=50000, help="documents generated per task")
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many")
+    parser.add_argument("--drop", action="store_true", help="drop the seeded collections first")
+    args = parser.parse_args()
+    if args.notifications is None:
+        args.notifications = args.transactions // 10
+    if args.messages is None:
+        args.messages = args.users
+    if args.support_tickets is None:
+        args.support_tickets = args.users // 10
+    return args
+
+
+def main():
+    args = parse_args()
+    from passlib.context import CryptContext
+    from pymongo import MongoClient
+
+    plan = SeedPlan(args.seed, args.users, args.months, args.end, args.skew, CryptContext(schemes=["bcrypt"]).hash(SEED_PASSWORD))
+    validate_samples(plan)
+
+    database = MongoClient(args.mongo_url)[args.db_name]
+    counts = {
+        "users": args.users,
+        "transactions": args.transactions,
+        "notifications": args.notifications,
+        "messages": args.messages,
+        "support_tickets": args.support_tickets
+    }
+    for collection in COLLECTIONS:
+        if args.drop:
+            database.drop_collection(collection)
+        elif database[collection].estimated_document_count():
+            raise SystemExit(f"{args.db_name}.{collection} is not empty; pass --drop to replace it")
+    # Rebuilt from the seeded data on the next startup
+    database.platform_stats.delete_many({})
+
+    print(f"Seeding {args.db_name} (seed {args.seed}, {plan.start:%Y-%m-%d} to {plan.end:%Y-%m-%d}) with {args.workers} workers")
+    started_at = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(args.mongo_url, args.db_name)) as executor:
+        for collection in COLLECTIONS:
+            collection_started_at = time.perf_counter()
+            futures = [
+                executor.submit(insert_chunk, plan, collection, chunk, args.chunk_size, counts[collection], args.batch_size)
+                for chunk in range((counts[collection] + args.chunk_size - 1) // args.chunk_size)
+            ]
+            inserted = 0
+            for future in as_completed(futures):
+                inserted += future.result()
+            elapsed = time.perf_counter() - collection_started_at
+            print(f"{collection:<16} {inserted:>12,} docs in {elapsed:7.1f}s ({inserted / elapsed if elapsed else 0:,.0f} docs/s)")
+
+    total = sum(counts.values())
+    elapsed = time.perf_counter() - started_at
+    print(f"{'total':<16} {total:>12,} docs in {elapsed:7.1f}s ({total / elapsed:,.0f} docs/s)")
+    print(f"Log in as {plan.user_email(0)} (admin) or user<N>@seed.bitsecure.com with password {SEED_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of list response serialization.
+
+Compares the previous path (build the models, let FastAPI re-validate them against
+response_model and encode with the stdlib json module) against model_list_response,
+which validates the documents once and dumps JSON straight from pydantic-core.
+No MongoDB server is needed.
+
+    python benchmarks/serialization_benchmark.py [iterations]
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+import server  # noqa: E402
+
+response_field = create_response_field(name="Response", type_=List[server.Transaction])
+
+
+def make_documents(count):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "type": "deposit" if i % 2 else "withdrawal",
+            "method": "Crypto (BTC)",
+            "amount": 10.0 + i,
+            "details": "Enviado a: bc1qflt3sxs06c6jnj25hj85py5tjjl4gnsraph9ky",
+            "status": "pending",
+            "created_at": server.datetime.utcnow()
+        }
+        for i in range(count)
+    ]
+
+
+async def previous_path(documents):
+    content = await serialize_response(
+        field=response_field,
+        response_content=[server.Transaction(**document) for document in documents]
+    )
+    return JSONResponse(content=content).body
+
+
+async def current_path(documents):
+    return server.model_list_response(server.Transaction, documents, server.Response()).body
+
+
+def benchmark(label, serialize, documents, iterations):
+    async def run():
+        for _ in range(iterations):
+            await serialize(documents)
+
+    started_at = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started_at
+    print(f"{label:<28} {elapsed / iterations * 1e3:8.3f} ms/response")
+    return elapsed / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for count in (100, 1000):
+        documents = make_documents(count)
+        print(f"Serializing {count} transactions {iterations:,} times")
+        previous = benchmark("response_model + json", previous_path, documents, iterations)
+        current = benchmark("TypeAdapter + dump_json", current_path, documents, iterations)
+        print(f"Speed-up: {previous / current:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
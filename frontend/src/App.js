@@ -14,6 +14,45 @@ import Toast from './components/Toast';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Access tokens are short-lived: on a 401, rotate the refresh token once and replay the request
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshPromise = (refreshToken
+      ? axios.post(`${API}/auth/refresh`, { refresh_token: refreshToken }).then((response) => {
+          localStorage.setItem('token', response.data.access_token);
+          localStorage.setItem('refresh_token', response.data.refresh_token);
+          return response.data.access_token;
+        })
+      : Promise.reject(new Error('No refresh token'))
+    ).finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
+axios.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const { config, response } = error;
+    if (!config || config._retried || response?.status !== 401 || /\/auth\/(login|register|refresh|logout)$/.test(config.url)) {
+      return Promise.reject(error);
+    }
+
+    try {
+      const token = await refreshAccessToken();
+      config._retried = true;
+      config.headers.Authorization = `Bearer ${token}`;
+      return axios(config);
+    } catch (refreshError) {
+      return Promise.reject(error);
+    }
+  }
+);
+
 function App() {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -42,6 +81,7 @@ function App() {
       setUser(response.data);
     } catch (error) {
       localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
       setUser(null);
     } finally {
       setLoading(false);
@@ -55,8 +95,9 @@ function App() {
         password
       });
       
-      const { access_token, user: userData } = response.data;
+      const { access_token, refresh_token, user: userData } = response.data;
       localStorage.setItem('token', access_token);
+      localStorage.setItem('refresh_token', refresh_token);
       setUser(userData);
       showToast('Inicio de sesión exitoso', 'success');
       return { success: true };
@@ -75,8 +116,9 @@ function App() {
         password
       });
       
-      const { access_token, user: userData } = response.data;
+      const { access_token, refresh_token, user: userData } = response.data;
       localStorage.setItem('token', access_token);
+      localStorage.setItem('refresh_token', refresh_token);
       setUser(userData);
       showToast('Registro exitoso. ¡Bienvenido!', 'success');
       return { success: true };
@@ -88,7 +130,15 @@ function App() {
   };
 
   const logout = () => {
+    const token = localStorage.getItem('token');
+    if (token) {
+      // Revoke both tokens server-side; the local session ends regardless of the outcome
+      axios.post(`${API}/auth/logout`, { refresh_token: localStorage.getItem('refresh_token') }, {
+        headers: { Authorization: `Bearer ${token}` }
+      }).catch(() => {});
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     setUser(null);
     showToast('Sesión cerrada correctamente', 'success');
   };
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useSearchParams, Link } from 'react-router-dom';
 import axios from 'axios';
+import { subscribeTradingData } from '../lib/tradingStream';
 import { 
   HomeIcon, 
   ChartBarIcon, 
@@ -44,6 +45,7 @@ const Dashboard = ({ user, setUser, showToast, getAuthHeaders, API }) => {
   const [allTransactions, setAllTransactions] = useState([]);
   const [notifications, setNotifications] = useState([]);
   const [notificationsExpanded, setNotificationsExpanded] = useState(false);
+  const [unreadNotifications, setUnreadNotifications] = useState(null);
   const [adminStats, setAdminStats] = useState({ total_users: 0, total_balance: 0 });
   const [allUsers, setAllUsers] = useState([]);
   const [walletAddresses, setWalletAddresses] = useState({});
@@ -82,8 +84,7 @@ const Dashboard = ({ user, setUser, showToast, getAuthHeaders, API }) => {
 
   useEffect(() => {
     loadInitialData();
-    const tradingInterval = setInterval(loadTradingData, 4000);
-    return () => clearInterval(tradingInterval);
+    return subscribeTradingData(API, setTradingData);
   }, []);
 
   useEffect(() => {
@@ -94,6 +95,49 @@ const Dashboard = ({ user, setUser, showToast, getAuthHeaders, API }) => {
     }
   }, [activeTab, user.is_admin]);
 
+  useEffect(() => {
+    // Live admin feed: new notifications and the unread counter are pushed by the server
+    if (activeTab !== 'admin' || !user.is_admin || !window.EventSource) return undefined;
+
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+    const retry = () => {
+      if (!closed) retryTimer = setTimeout(connect, 3000);
+    };
+    const connect = async () => {
+      try {
+        // Tickets are single-use, so every (re)connect asks for a fresh one with the current access token
+        const response = await axios.post(`${API}/admin/notifications/stream-ticket`, null, {
+          headers: getAuthHeaders()
+        });
+        if (closed) return;
+        source = new EventSource(`${API}/admin/notifications/stream?ticket=${encodeURIComponent(response.data.ticket)}`);
+      } catch (error) {
+        retry();
+        return;
+      }
+      source.addEventListener('notification', (event) => {
+        const notification = JSON.parse(event.data);
+        setNotifications(prev => [notification, ...prev]);
+      });
+      source.addEventListener('unread', (event) => {
+        setUnreadNotifications(JSON.parse(event.data).unread);
+      });
+      // The browser's own reconnect would replay the spent ticket
+      source.onerror = () => {
+        source.close();
+        retry();
+      };
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, [activeTab, user.is_admin]);
+
   const loadInitialData = async () => {
     await Promise.all([
       loadTradingData(),
@@ -340,7 +384,7 @@ const Dashboard = ({ user, setUser, showToast, getAuthHeaders, API }) => {
       await axios.put(`${API}/admin/notifications/${notificationId}/read`, {}, {
         headers: getAuthHeaders()
       });
-      await loadAdminData();
+      setNotifications(prev => prev.map(n => (n.id === notificationId ? { ...n, read: true } : n)));
     } catch (error) {
       console.error('Error marking notification as read:', error);
     }
@@ -1105,7 +1149,7 @@ const Dashboard = ({ user, setUser, showToast, getAuthHeaders, API }) => {
                 </div>
                 <div className="stat-card">
                   <h3>Notificaciones</h3>
-                  <div className="stat-value">{notifications.filter(n => !n.read).length}</div>
+                  <div className="stat-value">{unreadNotifications ?? notifications.filter(n => !n.read).length}</div>
                 </div>
               </div>
 
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
+import { subscribeTradingData } from '../lib/tradingStream';
 import { 
   RocketIcon, 
   MoneyIcon, 
@@ -28,8 +29,7 @@ const HomePage = ({ user, getAuthHeaders }) => {
 
   useEffect(() => {
     loadDashboardData();
-    const interval = setInterval(loadTradingData, 4000);
-    return () => clearInterval(interval);
+    return subscribeTradingData(API, setTradingData);
   }, []);
 
   const loadDashboardData = async () => {
@@ -50,15 +50,6 @@ const HomePage = ({ user, getAuthHeaders }) => {
     }
   };
 
-  const loadTradingData = async () => {
-    try {
-      const response = await axios.get(`${API}/trading/data`);
-      setTradingData(response.data.pairs);
-    } catch (error) {
-      console.error('Error loading trading data:', error);
-    }
-  };
-
   const formatPrice = (price) => {
     if (price >= 1000) {
       return `$${price.toLocaleString('es-ES', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
+import { subscribeTradingData } from '../lib/tradingStream';
 import { 
   ChartBarIcon, 
   SearchIcon, 
@@ -33,24 +34,10 @@ const LandingPage = () => {
   const [submitStatus, setSubmitStatus] = useState('');
 
   useEffect(() => {
-    // Load trading data
-    loadTradingData();
-    
-    // Update trading data every 4 seconds
-    const interval = setInterval(loadTradingData, 4000);
-    
-    return () => clearInterval(interval);
+    // Live trading data pushed by the server
+    return subscribeTradingData(API, setTradingData);
   }, []);
 
-  const loadTradingData = async () => {
-    try {
-      const response = await axios.get(`${API}/trading/data`);
-      setTradingData(response.data.pairs);
-    } catch (error) {
-      console.error('Error loading trading data:', error);
-    }
-  };
-
   const toggleFAQ = (index) => {
     setActiveFAQ(activeFAQ === index ? null : index);
   };
@@ -0,0 +1,44 @@
+import axios from 'axios';
+
+// Subscribes to the market snapshots pushed by the backend over Server-Sent
+// Events, falling back to polling /trading/data when the stream is unavailable.
+// Returns an unsubscribe function suitable as a useEffect cleanup.
+export const subscribeTradingData = (API, onPairs, pollInterval = 4000) => {
+  let source = null;
+  let interval = null;
+
+  const poll = async () => {
+    try {
+      const response = await axios.get(`${API}/trading/data`);
+      onPairs(response.data.pairs);
+    } catch (error) {
+      console.error('Error loading trading data:', error);
+    }
+  };
+
+  const startPolling = () => {
+    if (interval) return;
+    poll();
+    interval = setInterval(poll, pollInterval);
+  };
+
+  if (window.EventSource) {
+    source = new EventSource(`${API}/trading/stream`);
+    source.addEventListener('snapshot', (event) => {
+      onPairs(JSON.parse(event.data).pairs);
+    });
+    source.onerror = () => {
+      // EventSource retries by itself unless the server refused the stream
+      if (source.readyState === EventSource.CLOSED) {
+        startPolling();
+      }
+    };
+  } else {
+    startPolling();
+  }
+
+  return () => {
+    if (source) source.close();
+    if (interval) clearInterval(interval);
+  };
+};
@@ -0,0 +1,10 @@
+"""
+Shared test setup: server.py reads MONGO_URL at import time, and the backend and benchmarks are plain script directories.
+"""
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
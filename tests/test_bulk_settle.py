@@ -0,0 +1,98 @@
+"""
+Bulk approve/reject must settle each pending transaction exactly once and move balances and platform stats by the same amounts as the single-item routes.
+"""
+import asyncio
+
+import pytest
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient().get_database("bitsecure_test")
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "shared_state", server.InProcessState())
+    asyncio.run(server.shared_state.start(server.dispatch_shared_message))
+    return database
+
+
+def seed(database, transactions):
+    async def insert():
+        for name in ("ana", "bruno"):
+            await database.users.insert_one(server.User(id=name, name=name.title(), email=f"{name}@bitsecure.com", password_hash="x").dict())
+        await database.transactions.insert_many([
+            server.Transaction(id=transaction_id, user_id=user_id, type="deposit", method=method, amount=amount, details="test", status=status).dict()
+            for transaction_id, user_id, method, amount, status in transactions
+        ])
+        pending = [transaction for transaction in transactions if transaction[4] == "pending"]
+        await database.platform_stats.insert_one({
+            "_id": server.PLATFORM_STATS_ID,
+            "total_balance": 0.0,
+            "pending_count": len(pending),
+            "pending_amount": sum(transaction[3] for transaction in pending)
+        })
+    asyncio.run(insert())
+
+
+def balances(database, user_id):
+    user = asyncio.run(database.users.find_one({"id": user_id}))
+    return user["balance"], user["crypto_balances"]
+
+
+def test_results_cover_duplicates_and_failures(database):
+    seed(database, [
+        ("t1", "ana", "Crypto (BTC)", 10.0, "pending"),
+        ("t2", "ana", "Crypto (BTC)", 20.0, "completed")
+    ])
+
+    results = asyncio.run(server.settle_transactions(["t1", "t2", "t1", "missing"], approve=True))
+
+    assert [(result["transaction_id"], result["status"]) for result in results] == [
+        ("t1", "approved"), ("t2", "already_processed"), ("missing", "not_found")
+    ]
+    assert balances(database, "ana")[0] == 10.0
+    # Settled transactions are claimed once: a second call finds nothing pending
+    again = asyncio.run(server.settle_transactions(["t1"], approve=True))
+    assert again == [{"transaction_id": "t1", "status": "already_processed"}]
+
+
+def test_approval_merges_credits_per_user_and_moves_stats(database):
+    seed(database, [
+        ("t1", "ana", "Crypto (BTC)", 10.0, "pending"),
+        ("t2", "ana", "Crypto (ETH)", 20.0, "pending"),
+        ("t3", "ana", "Crypto (BTC)", 5.0, "pending"),
+        ("t4", "bruno", "CryptoVoucher", 40.0, "pending")
+    ])
+
+    results = asyncio.run(server.settle_transactions(["t1", "t2", "t3", "t4"], approve=True))
+
+    assert [result["crypto_type"] for result in results] == ["BTC", "ETH", "BTC", "USDT"]
+    balance, crypto = balances(database, "ana")
+    assert balance == 35.0 and crypto["BTC"] == 15.0 and crypto["ETH"] == 20.0
+    balance, crypto = balances(database, "bruno")
+    assert balance == 40.0 and crypto["USDT"] == 40.0
+
+    stats = asyncio.run(database.platform_stats.find_one({"_id": server.PLATFORM_STATS_ID}))
+    assert stats["pending_count"] == 0 and stats["pending_amount"] == 0.0
+    assert stats["total_balance"] == 75.0
+    assert stats["crypto_balances"] == {"BTC": 15.0, "ETH": 20.0, "USDT": 40.0}
+    assert asyncio.run(database.notifications.count_documents({"type": "deposit_approved"})) == 4
+
+
+def test_rejection_only_releases_pending_totals(database):
+    seed(database, [
+        ("t1", "ana", "Crypto (BTC)", 10.0, "pending"),
+        ("t2", "bruno", "Crypto (ADA)", 30.0, "pending")
+    ])
+
+    results = asyncio.run(server.settle_transactions(["t1", "t2"], approve=False))
+
+    assert [result["status"] for result in results] == ["rejected", "rejected"]
+    assert balances(database, "ana")[0] == 0.0 and balances(database, "bruno")[0] == 0.0
+    stats = asyncio.run(database.platform_stats.find_one({"_id": server.PLATFORM_STATS_ID}))
+    assert (stats["pending_count"], stats["pending_amount"], stats["total_balance"]) == (0, 0.0, 0.0)
+    statuses = asyncio.run(database.transactions.distinct("status"))
+    assert statuses == ["failed"]
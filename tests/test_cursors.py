@@ -0,0 +1,44 @@
+"""
+Keyset cursors must round-trip the sort value and only be accepted by the sort and order that issued them.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+@pytest.mark.parametrize("field, value", [
+    ("created_at", datetime(2024, 6, 1, 12, 30, 15, 250000)),
+    ("balance", 1250.75),
+    ("email_lower", "ana@bitsecure.com")
+])
+def test_cursor_round_trips_the_sort_value(field, value):
+    cursor = server.encode_cursor({field: value, "id": "user-1"}, field)
+
+    assert server.decode_cursor(cursor, field) == {"value": value, "id": "user-1"}
+
+
+def test_cursor_is_rejected_by_another_sort():
+    cursor = server.encode_cursor({"balance": 10.0, "id": "user-1"}, "balance")
+
+    with pytest.raises(HTTPException) as error:
+        server.decode_cursor(cursor, "created_at")
+    assert error.value.status_code == 400
+
+
+def test_cursor_is_rejected_by_the_opposite_order():
+    cursor = server.encode_cursor({"email_lower": "ana@bitsecure.com", "id": "user-1"}, "email_lower", descending=False)
+
+    assert server.decode_cursor(cursor, "email_lower", descending=False)["value"] == "ana@bitsecure.com"
+    with pytest.raises(HTTPException) as error:
+        server.decode_cursor(cursor, "email_lower", descending=True)
+    assert error.value.status_code == 400
+
+
+def test_user_carries_lowercased_search_fields():
+    user = server.User(name="Álvaro Pérez", email="Alvaro.Perez@BitSecure.com", password_hash="secret")
+
+    assert user.dict()["email_lower"] == "alvaro.perez@bitsecure.com"
+    assert user.dict()["name_lower"] == "álvaro pérez"
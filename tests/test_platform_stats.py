@@ -0,0 +1,53 @@
+"""
+Rebuilding the platform stats must give the source totals however many builders race on an empty collection.
+"""
+import asyncio
+
+import pytest
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient().get_database("bitsecure_test")
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "shared_state", server.InProcessState())
+    asyncio.run(database.users.insert_many([
+        server.User(name=f"User {i}", email=f"user{i}@bitsecure.com", password_hash="x", balance=100.0).dict()
+        for i in range(3)
+    ]))
+    return database
+
+
+def stored_stats(database):
+    return asyncio.run(database.platform_stats.find_one({"_id": server.PLATFORM_STATS_ID}))
+
+
+def test_concurrent_first_builds_do_not_add_up(database, monkeypatch):
+    compute = server.compute_platform_stats
+
+    async def slow_compute():
+        # Both builders read the missing document before either writes, as with real scans
+        expected = await compute()
+        await asyncio.sleep(0.01)
+        return expected
+    monkeypatch.setattr(server, "compute_platform_stats", slow_compute)
+
+    async def build_twice():
+        await asyncio.gather(server.reconcile_platform_stats(), server.reconcile_platform_stats())
+    asyncio.run(build_twice())
+
+    stats = stored_stats(database)
+    assert (stats["total_users"], stats["total_balance"]) == (3, 300.0)
+
+
+def test_document_created_by_a_bump_is_corrected(database):
+    asyncio.run(server.bump_platform_stats({"total_users": 1}))
+
+    asyncio.run(server.reconcile_platform_stats())
+
+    stats = stored_stats(database)
+    assert (stats["total_users"], stats["total_balance"]) == (3, 300.0)
@@ -0,0 +1,84 @@
+"""
+Every Mongo read on the API paths must project exactly the fields of its response model.
+"""
+import asyncio
+
+import orjson
+import pytest
+
+import server
+
+
+class RecordingCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        return self
+
+    def limit(self, count):
+        return self
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+
+class RecordingCollection:
+    """Stands in for a Motor collection and remembers the projection of the last read"""
+
+    def __init__(self, document):
+        self.document = document
+        self.projection = None
+
+    def project(self, projection):
+        self.projection = projection
+        return {field: value for field, value in self.document.items() if projection.get(field)}
+
+    async def find_one(self, query, projection=None):
+        return self.project(projection)
+
+    def find(self, query, projection=None):
+        return RecordingCursor([self.project(projection)])
+
+
+ADMIN = server.UserResponse(**server.User(name="Admin", email="admin@bitsecure.com", password_hash="secret", is_admin=True).dict())
+
+LIST_ENDPOINTS = [
+    (server.get_all_users, "users", server.UserResponse, server.User(name="Ana", email="Ana@bitsecure.com", password_hash="secret")),
+    (server.get_transactions, "transactions", server.Transaction,
+     server.Transaction(user_id=ADMIN.id, type="deposit", method="Crypto (BTC)", amount=10.0, details="test")),
+    (server.get_all_support_tickets, "support_tickets", server.SupportTicket,
+     server.SupportTicket(user_id=ADMIN.id, user_name="Admin", user_email=ADMIN.email, subject="Ayuda", message="test")),
+    (server.get_user_messages, "messages", server.Message, server.Message(to_user_id=ADMIN.id, subject="Hola", content="test")),
+    (server.get_notifications, "notifications", server.Notification, server.Notification(title="Aviso", message="test")),
+]
+LIST_ENDPOINTS = [pytest.param(*case, id=case[0].__name__) for case in LIST_ENDPOINTS]
+
+
+@pytest.mark.parametrize("endpoint, collection, model, document", LIST_ENDPOINTS)
+def test_list_endpoint_projects_model_fields(monkeypatch, endpoint, collection, model, document):
+    # Stored documents carry more than the response: _id, and password_hash plus the search fields on users
+    recording = RecordingCollection({"_id": "object-id", **document.dict()})
+    database = type("Database", (), {collection: recording})()
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "reporting_db", database)
+
+    response = asyncio.run(endpoint(response=server.Response(), limit=10, after=None, current_user=ADMIN))
+
+    assert recording.projection.pop("_id") == 0
+    assert set(recording.projection) == set(model.model_fields)
+    assert "password_hash" not in recording.projection
+    assert set(orjson.loads(response.body)[0]) == set(model.model_fields)
+
+
+def test_authenticated_user_is_read_without_password_hash(monkeypatch):
+    user = server.User(name="Projection", email="projection@bitsecure.com", password_hash="secret")
+    users = RecordingCollection({"_id": "object-id", **user.dict()})
+    monkeypatch.setattr(server, "db", type("Database", (), {"users": users})())
+    monkeypatch.setattr(server, "user_cache", server.TTLCache(0, 0))
+
+    token = server.create_access_token(data={"sub": user.id})
+    current_user = asyncio.run(server.authenticate_token(token))
+
+    assert users.projection == server.model_projection(server.UserResponse)
+    assert current_user.id == user.id
@@ -0,0 +1,45 @@
+"""
+A refresh token must be redeemable once across all workers, not only within the worker that saw it first.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient().get_database("bitsecure_test")
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "shared_state", server.InProcessState())
+    monkeypatch.setattr(server, "revoked_tokens", server.RevocationSet())
+    asyncio.run(server.shared_state.start(server.dispatch_shared_message))
+    return database
+
+
+def refresh(token):
+    return asyncio.run(server.refresh_tokens(server.RefreshRequest(refresh_token=token)))
+
+
+def test_refresh_token_is_single_use(database):
+    token = server.issue_tokens("ana")["refresh_token"]
+
+    assert refresh(token)["refresh_token"] != token
+    with pytest.raises(HTTPException) as excinfo:
+        refresh(token)
+    assert excinfo.value.status_code == 401
+
+
+def test_replay_to_a_worker_that_has_not_heard_is_rejected(database, monkeypatch):
+    token = server.issue_tokens("ana")["refresh_token"]
+    refresh(token)
+
+    # Another worker: its in-memory set has not received the revocation yet
+    monkeypatch.setattr(server, "revoked_tokens", server.RevocationSet())
+    with pytest.raises(HTTPException) as excinfo:
+        refresh(token)
+    assert excinfo.value.status_code == 401
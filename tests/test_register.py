@@ -0,0 +1,34 @@
+"""
+Concurrent registrations with the same email must give one account and the usual 400, never a 500.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient().get_database("bitsecure_test")
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "shared_state", server.InProcessState())
+    asyncio.run(database.users.create_index("email", unique=True))
+    return database
+
+
+def test_concurrent_duplicate_email_is_rejected(database):
+    async def register_twice():
+        user = server.UserCreate(name="Ana", email="ana@bitsecure.com", password="secreto123")
+        # Both pass the existence check while their passwords hash on the pool
+        return await asyncio.gather(server.register(user), server.register(user), return_exceptions=True)
+
+    results = asyncio.run(register_twice())
+
+    errors = [result for result in results if isinstance(result, BaseException)]
+    assert len(errors) == 1
+    assert isinstance(errors[0], HTTPException) and errors[0].status_code == 400
+    assert asyncio.run(database.users.count_documents({"email": "ana@bitsecure.com"})) == 1
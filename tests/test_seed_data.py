@@ -0,0 +1,56 @@
+"""
+The synthetic dataset must validate against the application's models and be reproducible from its seed.
+"""
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+import seed_data
+import server
+
+MODELS = {
+    "users": server.User,
+    "transactions": server.Transaction,
+    "notifications": server.Notification,
+    "messages": server.Message,
+    "support_tickets": server.SupportTicket
+}
+
+
+def make_plan(seed=7, users=1000, skew=3.0):
+    return seed_data.SeedPlan(seed, users, 6, datetime(2024, 6, 1), skew, "$2b$12$" + "x" * 53)
+
+
+@pytest.mark.parametrize("collection", seed_data.COLLECTIONS)
+def test_documents_validate_against_models(collection):
+    for document in seed_data.generate_chunk(make_plan(), collection, 3, 200, 2000):
+        model = MODELS[collection](**document)
+        assert model.dict() == document
+
+
+@pytest.mark.parametrize("collection", seed_data.COLLECTIONS)
+def test_chunks_are_reproducible_from_the_seed(collection):
+    first = seed_data.generate_chunk(make_plan(), collection, 1, 100, 1000)
+
+    assert seed_data.generate_chunk(make_plan(), collection, 1, 100, 1000) == first
+    assert seed_data.generate_chunk(make_plan(seed=8), collection, 1, 100, 1000) != first
+
+
+def test_documents_never_predate_their_user():
+    plan = make_plan()
+    created_at = {plan.user_id(index): plan.user_created_at(index) for index in range(plan.users)}
+
+    for transaction in seed_data.generate_chunk(plan, "transactions", 0, 2000, 2000):
+        assert created_at[transaction["user_id"]] <= transaction["created_at"] <= plan.end
+
+
+def test_transactions_are_skewed_towards_few_users():
+    plan = make_plan()
+    per_user = Counter(transaction["user_id"] for transaction in seed_data.generate_chunk(plan, "transactions", 0, 20000, 20000))
+
+    busiest = sum(count for _, count in per_user.most_common(plan.users // 100))
+    assert busiest / 20000 > 0.1
+    # Heavy users pull the mean well above the typical (median) user
+    counts = sorted(per_user.values())
+    assert counts[len(counts) // 2] < 20000 / plan.users
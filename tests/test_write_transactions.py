@@ -0,0 +1,99 @@
+"""
+Write transactions must be rerun on transient errors so a lost race surfaces the route's own error instead of a 500.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import OperationFailure
+
+import server
+
+
+class FakeSession:
+    def __init__(self):
+        self.in_transaction = False
+        self.commits = 0
+        self.aborts = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def start_transaction(self):
+        self.in_transaction = True
+
+    async def commit_transaction(self):
+        self.in_transaction = False
+        self.commits += 1
+
+    async def abort_transaction(self):
+        self.in_transaction = False
+        self.aborts += 1
+
+
+class FakeClient:
+    def __init__(self):
+        self.session = FakeSession()
+
+    async def start_session(self):
+        return self.session
+
+
+@pytest.fixture
+def session(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "MONGO_USE_TRANSACTIONS", True)
+    return client.session
+
+
+def write_conflict():
+    return OperationFailure("WriteConflict", code=112, details={"errorLabels": ["TransientTransactionError"]})
+
+
+def run_with_outcomes(outcomes):
+    attempts = []
+
+    async def callback(session):
+        attempts.append(session)
+        outcome = outcomes[len(attempts) - 1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return asyncio.run(server.run_in_write_transaction(callback)), attempts
+
+
+def test_transient_error_is_retried(session):
+    result, attempts = run_with_outcomes([write_conflict(), "done"])
+
+    assert result == "done" and len(attempts) == 2
+    assert (session.aborts, session.commits) == (1, 1)
+
+
+def test_retry_surfaces_the_route_error(session):
+    # The second approve of a transaction loses the write conflict and then finds it processed
+    with pytest.raises(HTTPException) as excinfo:
+        run_with_outcomes([write_conflict(), HTTPException(status_code=400, detail="La transacción ya ha sido procesada")])
+
+    assert excinfo.value.status_code == 400
+    assert (session.aborts, session.commits) == (2, 0)
+
+
+def test_other_errors_are_not_retried(session):
+    with pytest.raises(OperationFailure):
+        run_with_outcomes([OperationFailure("BadValue", code=2), "done"])
+
+    assert (session.aborts, session.commits) == (1, 0)
+
+
+def test_gives_up_after_the_configured_attempts(session, monkeypatch):
+    monkeypatch.setattr(server, "MONGO_TRANSACTION_ATTEMPTS", 2)
+
+    with pytest.raises(OperationFailure):
+        run_with_outcomes([write_conflict(), write_conflict(), "done"])
+
+    assert session.aborts == 2
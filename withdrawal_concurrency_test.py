@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for withdrawals: N parallel requests must never overdraw a balance
+"""
+import requests
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import random
+import string
+
+class WithdrawalConcurrencyTester:
+    def __init__(self, base_url="https://trade-portal-dev.preview.emergentagent.com/api", parallel=20):
+        self.base_url = base_url
+        self.parallel = parallel
+        self.test_results = []
+        self.tests_run = 0
+        self.tests_passed = 0
+
+    def log_test(self, name, success, details=""):
+        """Log test results"""
+        self.tests_run += 1
+        if success:
+            self.tests_passed += 1
+            print(f"✅ {name}")
+        else:
+            print(f"❌ {name} - {details}")
+
+        self.test_results.append({
+            "name": name,
+            "success": success,
+            "details": details
+        })
+
+    def generate_test_email(self):
+        """Generate unique test email"""
+        timestamp = datetime.now().strftime('%H%M%S')
+        random_str = ''.join(random.choices(string.ascii_lowercase, k=4))
+        return f"withdrawal_test_{timestamp}_{random_str}@bitsecure.com"
+
+    def make_request(self, method, endpoint, data=None, headers=None):
+        """Make HTTP request"""
+        url = f"{self.base_url}/{endpoint}"
+        test_headers = {'Content-Type': 'application/json'}
+
+        if headers:
+            test_headers.update(headers)
+
+        try:
+            if method == 'GET':
+                response = requests.get(url, headers=test_headers)
+            elif method == 'POST':
+                response = requests.post(url, json=data, headers=test_headers)
+            elif method == 'PUT':
+                response = requests.put(url, json=data, headers=test_headers)
+
+            return response.status_code, response.json() if response.content else {}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    def get_admin_token(self):
+        """Log in with ADMIN_EMAIL/ADMIN_PASSWORD, or register the first (admin) user on an empty database"""
+        if os.environ.get("ADMIN_EMAIL"):
+            status, response = self.make_request("POST", "auth/login", {
+                "email": os.environ["ADMIN_EMAIL"],
+                "password": os.environ.get("ADMIN_PASSWORD", "")
+            })
+        else:
+            status, response = self.make_request("POST", "auth/register", {
+                "name": "Admin User",
+                "email": self.generate_test_email(),
+                "password": "AdminPass123!"
+            })
+
+        if status != 200 or not response.get("user", {}).get("is_admin"):
+            return None
+        return response["access_token"]
+
+    def test_parallel_withdrawals(self):
+        """Fire parallel withdrawals that together exceed the balance and check the invariant"""
+        print("🚀 Testing Concurrent Withdrawals")
+        print("=" * 60)
+
+        admin_token = self.get_admin_token()
+        if not admin_token:
+            self.log_test("Admin Token", False, "Set ADMIN_EMAIL/ADMIN_PASSWORD or run against an empty database")
+            return False
+        admin_headers = {'Authorization': f'Bearer {admin_token}'}
+
+        status, response = self.make_request("POST", "auth/register", {
+            "name": "Withdrawal User",
+            "email": self.generate_test_email(),
+            "password": "TestPass123!"
+        })
+        if status != 200:
+            self.log_test("Test User Registration", False, f"Status {status}: {response}")
+            return False
+
+        user_headers = {'Authorization': f"Bearer {response['access_token']}"}
+        user_id = response['user']['id']
+
+        # Enough for a third of the requests to succeed
+        amount = 10.0
+        initial_balance = amount * (self.parallel // 3)
+        status, response = self.make_request("PUT", f"admin/users/{user_id}/balance?new_balance={initial_balance}", headers=admin_headers)
+        if status != 200:
+            self.log_test("Set Initial Balance", False, f"Status {status}: {response}")
+            return False
+
+        print(f"\n💸 Firing {self.parallel} parallel withdrawals of €{amount} against €{initial_balance}")
+        withdrawal_data = {"method": "bizum", "amount": amount, "details": {"phone": "600000000"}}
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            statuses = list(executor.map(
+                lambda _: self.make_request("POST", "withdrawals", withdrawal_data, user_headers)[0],
+                range(self.parallel)
+            ))
+
+        succeeded = statuses.count(200)
+        rejected = statuses.count(400)
+        print(f"   Succeeded: {succeeded}, rejected: {rejected}, other: {len(statuses) - succeeded - rejected}")
+
+        status, response = self.make_request("GET", "auth/me", headers=user_headers)
+        final_balance = response.get("balance")
+        print(f"   Final balance: {final_balance}")
+
+        self.log_test("No Unexpected Errors", succeeded + rejected == self.parallel, f"Statuses: {statuses}")
+        self.log_test("Balance Never Negative", final_balance is not None and final_balance >= 0, f"Final balance {final_balance}")
+        self.log_test(
+            "Debits Match Successful Withdrawals",
+            final_balance == initial_balance - succeeded * amount,
+            f"{initial_balance} - {succeeded} x {amount} != {final_balance}"
+        )
+        self.log_test("No Over-Withdrawal", succeeded <= initial_balance // amount, f"{succeeded} withdrawals succeeded")
+
+        return True
+
+    def run_test(self):
+        """Run the withdrawal concurrency test"""
+        success = self.test_parallel_withdrawals()
+
+        print("\n" + "=" * 60)
+        print("📊 WITHDRAWAL CONCURRENCY TEST SUMMARY")
+        print("=" * 60)
+        print(f"Total Tests: {self.tests_run}")
+        print(f"Passed: {self.tests_passed}")
+        print(f"Failed: {self.tests_run - self.tests_passed}")
+
+        failed_tests = [test for test in self.test_results if not test['success']]
+        if failed_tests:
+            print("\n❌ FAILED TESTS:")
+            for test in failed_tests:
+                print(f"   • {test['name']}: {test['details']}")
+
+        return success and not failed_tests
+
+if __name__ == "__main__":
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "https://trade-portal-dev.preview.emergentagent.com/api"
+    tester = WithdrawalConcurrencyTester(base_url)
+    sys.exit(0 if tester.run_test() else 1)